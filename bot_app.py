@@ -0,0 +1,268 @@
+"""The bot itself: client, events and startup.
+
+Started through bot.py, which is only an entry point so that worker
+processes spawned by utils.match_executor (they re-run the main script
+as __mp_main__) don't import discord and every cog again.
+"""
+import os
+import signal
+import csv
+import asyncio
+import discord
+from discord.ext import commands, tasks
+from dotenv import load_dotenv
+from utils.responses import load_responses, match_response
+from commands import general, moderation, application, osint, music
+from commands.application import init_db
+from commands.application import init_db, ApplicationView, TicketCloseView
+from discord import app_commands
+from commands.osint import blackbird
+from signal_handler import signal_command
+from discord.ui import View, Button, Modal, TextInput
+from discord import Interaction, TextStyle
+import logging
+import io
+import time
+import json
+from pathlib import Path
+import datetime
+from datetime import datetime, timedelta, timezone
+from utils import DummyInteraction
+from commands.application import ApplicationReviewView
+from types import SimpleNamespace
+import discord.opus
+import pkgutil, importlib
+import utils.responses as r
+from utils.command_sync import sync_if_changed
+from utils.persist import flush_all_sync
+from utils import import_report
+
+
+try:
+    import nacl
+except ImportError:
+    print("PyNaCl is not installed!")
+else:
+    print("PyNaCl is installed.")
+
+
+log_buffer = io.StringIO()
+handler = logging.StreamHandler(log_buffer)
+formatter = logging.Formatter('[%(asctime)s] %(levelname)s: %(message)s', "%Y-%m-%d %H:%M:%S")
+handler.setFormatter(formatter)
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+logger.addHandler(handler)
+
+load_dotenv()
+BLACKBIRDLOGS_ID = int(os.getenv("BLACKBIRDLOGS_ID", 0))
+STAFF_REVIEW_CHANNEL_ID = int(os.getenv("STAFF_REVIEW_CHANNEL_ID", "0"))
+PRUNE_LOG_CHANNEL_ID = int(os.getenv("STAFF_REVIEW_CHANNEL_ID", "0"))
+DEV_GUILD_ID = int(os.getenv("DEV_GUILD_ID", "0"))
+
+token = os.getenv("DISCORD_BOT_TOKEN")
+
+intents = discord.Intents.all()
+bot = commands.Bot(command_prefix="!", intents=intents)
+
+LAST_PRUNE_FILE = Path("last_prune.txt")
+
+
+def shutdown_handler():
+    # a loop callback rather than a plain signal handler, so it can never run
+    # in the middle of a writer's own flush_sync and deadlock on its lock
+    print("\n[main] Shutdown signal received.")
+    flush_all_sync()
+    # closing unloads every cog; atexit flushes anything saved after this
+    asyncio.get_running_loop().create_task(bot.close())
+
+EXTENSIONS = [
+    "commands.music",
+    "commands.e2simulator",
+    "commands.ssh",
+    "commands.tts",
+    "commands.admin_reload",
+    "commands.moderation",
+    "commands.application",
+    "commands.pruning_logic",
+    "commands.say",
+    "commands.keyword_alerts",
+    "commands.vsp",
+    "commands.encode",
+    "commands.tickets",
+    "commands.audit",
+    "commands.regexsearch",
+    "commands.message_index",
+    "commands.scan_jobs",
+]
+
+
+async def load_extensions():
+    results = await asyncio.gather(*(bot.load_extension(name) for name in EXTENSIONS), return_exceptions=True)
+    for name, result in zip(EXTENSIONS, results):
+        if isinstance(result, Exception):
+            print(f"Failed to load {name}: {result}")
+
+
+REHYDRATE_CONCURRENCY = int(os.getenv("REHYDRATE_CONCURRENCY", "8"))
+_pending_reviews: list | None = None
+_background_tasks: set[asyncio.Task] = set()
+
+
+def log_phase(label: str, started: float) -> float:
+    now = time.perf_counter()
+    print(f"[startup] {label}: {(now - started) * 1000:.0f} ms")
+    return now
+
+
+async def load_view_rows():
+    pending = await application.db.fetchall("SELECT message_id, user_id, data FROM pending_applications")
+    tickets = await application.db.fetchall("SELECT message_id, channel_id FROM tickets")
+    return pending, tickets
+
+
+def review_view(user_id, raw) -> ApplicationReviewView:
+    try:
+        app_data = json.loads(raw) if raw else {}
+    except json.JSONDecodeError:
+        app_data = {}
+    return ApplicationReviewView(applicant_id=user_id, application_data=app_data)
+
+
+def restore_views(pending, tickets):
+    # every button has a fixed custom_id, so binding views to message ids needs no fetch
+    bot.add_view(ApplicationView())
+    bot.add_view(TicketCloseView())
+    for msg_id, _ in tickets:
+        if msg_id:
+            bot.add_view(TicketCloseView(), message_id=msg_id)
+    for message_id, user_id, raw in pending:
+        bot.add_view(review_view(user_id, raw), message_id=message_id)
+
+
+async def verify_review_messages(pending):
+    """Background pass: put the buttons back on review messages that lost them."""
+    staff_channel = bot.get_channel(STAFF_REVIEW_CHANNEL_ID)
+    if not staff_channel or not pending:
+        return
+    started = time.perf_counter()
+    sem = asyncio.Semaphore(REHYDRATE_CONCURRENCY)
+    missing = repaired = 0
+
+    async def check(message_id, user_id, raw):
+        nonlocal missing, repaired
+        async with sem:
+            try:
+                msg = await staff_channel.fetch_message(message_id)
+                if not msg.components:
+                    await msg.edit(view=review_view(user_id, raw))
+                    repaired += 1
+            except discord.NotFound:
+                missing += 1
+            except Exception as e:
+                print(f"Failed to verify review view for {message_id}: {e}")
+
+    await asyncio.gather(*(check(*row) for row in pending))
+    log_phase(f"verified {len(pending)} review messages ({missing} missing, {repaired} repaired)", started)
+
+
+@bot.event
+async def setup_hook():
+    """Runs once per process, before the gateway connects."""
+    t = time.perf_counter()
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGINT, shutdown_handler)
+    except NotImplementedError:
+        pass  # Windows: Ctrl+C ends bot.run() instead, and the writers flush at exit
+    await init_db()
+    discord.opus.load_opus("/usr/lib/libopus.so")
+    print(">>> Opus loaded?", discord.opus.is_loaded())
+    t = log_phase("db + opus", t)
+
+    # Command Reg
+    bot.add_command(general.reload_responses)
+    bot.add_command(general.list_responses)
+    general.setup(bot.tree)
+    await load_extensions()
+    bot.tree.add_command(signal_command)
+    bot.tree.add_command(blackbird)
+    t = log_phase("extensions", t)
+    print(import_report.summary())
+    import_report.uninstall()
+    dev_guild = discord.Object(id=DEV_GUILD_ID) if DEV_GUILD_ID else None
+    if dev_guild:
+        # guild commands update instantly, handy while iterating on command signatures
+        bot.tree.copy_global_to(guild=dev_guild)
+    result = await sync_if_changed(bot.tree, guild=dev_guild)
+    if result.synced is None:
+        t = log_phase("command sync (unchanged, skipped)", t)
+    else:
+        t = log_phase("command sync", t)
+        print(result.diff.summary())
+
+    # Load responses
+    r.load_responses()
+    general.load_out_of_office()
+    t = log_phase("responses + out of office", t)
+
+    # Application Button Refresh
+    global _pending_reviews
+    _pending_reviews, tickets = await load_view_rows()
+    restore_views(_pending_reviews, tickets)
+    log_phase(f"views for {len(_pending_reviews)} applications, {len(tickets)} tickets", t)
+
+
+@bot.event
+async def on_ready():
+    # fires again after every reconnect, so only cheap work here
+    global _pending_reviews
+    print(f"Logged in as {bot.user}")
+    if _pending_reviews is not None:
+        # the channel cache is only filled once the gateway is ready
+        task = asyncio.create_task(verify_review_messages(_pending_reviews))
+        _background_tasks.add(task)
+        task.add_done_callback(_background_tasks.discard)
+        _pending_reviews = None
+
+    print("Bot is ready and applications work!.")
+
+
+@bot.event
+async def on_message(message: discord.Message):
+    if message.author.bot or not message.guild or not message.content:
+        return
+
+    txt = message.content
+    if message.mentions:
+        mention_responses = []
+        seen_ids = set()
+        for member in message.mentions:
+            if member.bot or member.id == message.author.id:
+                continue
+            if member.id in seen_ids:
+                continue
+            seen_ids.add(member.id)
+            status = general.get_out_of_office_status(member.id)
+            if status:
+                note = status.get("message") or "is currently out of office."
+                mention_responses.append(f"{member.display_name} is out of office: {note}")
+        if mention_responses:
+            await message.channel.send(
+                "\n".join(mention_responses),
+                allowed_mentions=discord.AllowedMentions.none(),
+            )
+
+    entry = r.first_match(txt)
+    if entry:
+        resp = entry.get("response", "")
+        if resp:
+            await message.channel.send(resp, allowed_mentions=discord.AllowedMentions.none())
+
+    await bot.process_commands(message)
+
+
+def run():
+    if token:
+        bot.run(token)
+    else:
+        print("Bot token not found in .env file.")
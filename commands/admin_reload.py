@@ -1,20 +1,41 @@
 import discord
+from typing import Literal
 from discord.ext import commands
 from discord import app_commands
+from utils.command_sync import sync_if_changed
 
 class AdminReload(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
     @app_commands.command(name="sync", description="Sync slash commands with Discord")
+    @app_commands.describe(
+        scope="global, or only this server (updates instantly, for testing)",
+        force="Sync even if nothing changed since the last sync"
+    )
     @app_commands.checks.has_permissions(administrator=True)
-    async def sync(self, interaction: discord.Interaction):
+    async def sync(
+        self,
+        interaction: discord.Interaction,
+        scope: Literal["global", "guild"] = "global",
+        force: bool = False
+    ):
         await interaction.response.defer(ephemeral=True)
 
+        guild = None
+        if scope == "guild":
+            guild = interaction.guild
+            self.bot.tree.copy_global_to(guild=guild)
+        where = "globally" if guild is None else "to this server"
+
         try:
-            synced = await self.bot.tree.sync()
+            result = await sync_if_changed(self.bot.tree, guild=guild, force=force)
+            if result.synced is None:
+                content = f"No command changes since the last sync {where}; nothing to do."
+            else:
+                content = f"Synced {len(result.synced)} commands {where}.\n{result.diff.summary()}"
             await interaction.followup.send(
-                f"Synced {len(synced)} commands globally.",
+                content[:1990],
                 ephemeral=True
             )
         except Exception as e:
@@ -1,10 +1,11 @@
-import os, io, csv, json, sqlite3, asyncio
+import os, io, csv, json, asyncio
 from pathlib import Path
 import discord
 from discord import app_commands, Interaction
 from discord.ext import commands
 from dotenv import load_dotenv
 from datetime import timedelta
+from utils.db import Database
 
 load_dotenv()
 BASE_DIR = Path(__file__).resolve().parents[1]
@@ -44,52 +45,63 @@ def build_application_nickname(name: str, pronouns: str) -> str | None:
 
 
 # SQL Shit
-def init_db():
-    with sqlite3.connect(DB_PATH) as con:
-        c = con.cursor()
-        c.execute("""CREATE TABLE IF NOT EXISTS applications(
-            user_id INTEGER PRIMARY KEY, submitted_at TEXT, status TEXT NOT NULL DEFAULT 'pending')""")
-        c.execute("""CREATE TABLE IF NOT EXISTS pending_applications(
-            message_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, data TEXT NOT NULL)""")
-        c.execute("""CREATE TABLE IF NOT EXISTS tickets(
-            message_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL)""")
-        c.execute("""CREATE TABLE IF NOT EXISTS app_sessions(
-            message_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, data TEXT NOT NULL)""")
-        con.commit()
-
-def has_submitted(user_id:int)->bool:
-    with sqlite3.connect(DB_PATH) as con:
-        return con.execute("SELECT 1 FROM applications WHERE user_id=?", (int(user_id),)).fetchone() is not None
-
-def mark_as_submitted(user_id:int, submitted_at:str):
-    with sqlite3.connect(DB_PATH) as con:
-        con.execute("INSERT OR REPLACE INTO applications(user_id,submitted_at,status) VALUES(?,?,'pending')",
-                    (int(user_id), submitted_at)); con.commit()
-
-def store_pending_application(message_id:int, user_id:int, data:dict):
-    with sqlite3.connect(DB_PATH) as con:
-        con.execute("INSERT OR REPLACE INTO pending_applications(message_id,user_id,data) VALUES(?,?,?)",
-                    (int(message_id), int(user_id), json.dumps(data))); con.commit()
-
-def delete_pending(*, user_id:int|None=None, message_id:int|None=None):
-    with sqlite3.connect(DB_PATH) as con:
+MIGRATIONS = [
+    # 1: original tables, created with IF NOT EXISTS so existing files just get stamped
+    ["""CREATE TABLE IF NOT EXISTS applications(
+        user_id INTEGER PRIMARY KEY, submitted_at TEXT, status TEXT NOT NULL DEFAULT 'pending')""",
+     """CREATE TABLE IF NOT EXISTS pending_applications(
+        message_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, data TEXT NOT NULL)""",
+     """CREATE TABLE IF NOT EXISTS tickets(
+        message_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL)""",
+     """CREATE TABLE IF NOT EXISTS app_sessions(
+        message_id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, data TEXT NOT NULL)"""],
+    # 2: delete_pending(user_id=...) runs on every approval
+    ["CREATE INDEX IF NOT EXISTS idx_pending_applications_user ON pending_applications(user_id)",
+     "CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets(channel_id)"],
+]
+
+db = Database(DB_PATH, migrations=MIGRATIONS)
+
+async def init_db():
+    await db.connect()
+
+async def has_submitted(user_id:int)->bool:
+    return await db.fetchone("SELECT 1 FROM applications WHERE user_id=?", (int(user_id),)) is not None
+
+async def mark_as_submitted(user_id:int, submitted_at:str):
+    await db.execute("INSERT OR REPLACE INTO applications(user_id,submitted_at,status) VALUES(?,?,'pending')",
+                     (int(user_id), submitted_at))
+
+async def store_pending_application(message_id:int, user_id:int, data:dict):
+    await db.execute("INSERT OR REPLACE INTO pending_applications(message_id,user_id,data) VALUES(?,?,?)",
+                     (int(message_id), int(user_id), json.dumps(data)))
+
+async def delete_pending(*, user_id:int|None=None, message_id:int|None=None):
+    def delete(con):
         if user_id: con.execute("DELETE FROM pending_applications WHERE user_id=?", (int(user_id),))
         if message_id: con.execute("DELETE FROM pending_applications WHERE message_id=?", (int(message_id),))
-        con.commit()
+    await db.run(delete)
 
-def session_get(mid:int)->dict|None:
-    with sqlite3.connect(DB_PATH) as con:
-        r = con.execute("SELECT data FROM app_sessions WHERE message_id=?", (int(mid),)).fetchone()
-        return json.loads(r[0]) if r else None
+async def session_get(mid:int)->dict|None:
+    r = await db.fetchone("SELECT data FROM app_sessions WHERE message_id=?", (int(mid),))
+    return json.loads(r[0]) if r else None
+
+async def session_set(mid:int, uid:int, data:dict):
+    await db.execute("INSERT OR REPLACE INTO app_sessions(message_id,user_id,data) VALUES(?,?,?)",
+                     (int(mid), int(uid), json.dumps(data)))
 
-def session_set(mid:int, uid:int, data:dict):
-    with sqlite3.connect(DB_PATH) as con:
+async def session_update(mid:int, uid:int, **fields):
+    """Merge fields into a session in one transaction, so quick clicks can't drop each other's answers."""
+    def update(con):
+        r = con.execute("SELECT data FROM app_sessions WHERE message_id=?", (int(mid),)).fetchone()
+        d = json.loads(r[0]) if r else {}
+        d.update(fields)
         con.execute("INSERT OR REPLACE INTO app_sessions(message_id,user_id,data) VALUES(?,?,?)",
-                    (int(mid), int(uid), json.dumps(data))); con.commit()
+                    (int(mid), int(uid), json.dumps(d)))
+    await db.run(update)
 
-def session_del(mid:int):
-    with sqlite3.connect(DB_PATH) as con:
-        con.execute("DELETE FROM app_sessions WHERE message_id=?", (int(mid),)); con.commit()
+async def session_del(mid:int):
+    await db.execute("DELETE FROM app_sessions WHERE message_id=?", (int(mid),))
 
 class ApplicationFormView(discord.ui.View):
     def __init__(self):
@@ -105,9 +117,7 @@ class ApplicationFormView(discord.ui.View):
                 self.v = discord.ui.TextInput(label="First name only", style=discord.TextStyle.short, required=True)
                 self.add_item(self.v)
             async def on_submit(ms, mi: discord.Interaction):
-                d = session_get(ms.mid) or {}
-                d["name"] = str(ms.v.value)
-                session_set(ms.mid, mi.user.id, d)
+                await session_update(ms.mid, mi.user.id, name=str(ms.v.value))
                 await mi.response.send_message("Saved.", ephemeral=(mi.guild_id is not None))
         await i.response.send_modal(M(msg_id))
 
@@ -121,9 +131,7 @@ class ApplicationFormView(discord.ui.View):
                 self.v = discord.ui.TextInput(label="she/her, he/him, etc.", style=discord.TextStyle.short, required=True)
                 self.add_item(self.v)
             async def on_submit(ms, mi: discord.Interaction):
-                d = session_get(ms.mid) or {}
-                d["pronouns"] = str(ms.v.value)
-                session_set(ms.mid, mi.user.id, d)
+                await session_update(ms.mid, mi.user.id, pronouns=str(ms.v.value))
                 await mi.response.send_message("Saved.", ephemeral=(mi.guild_id is not None))
         await i.response.send_modal(M(msg_id))
 
@@ -137,9 +145,7 @@ class ApplicationFormView(discord.ui.View):
                 self.v = discord.ui.TextInput(label="Where did you hear about us?", style=discord.TextStyle.paragraph, required=True)
                 self.add_item(self.v)
             async def on_submit(ms, mi: discord.Interaction):
-                d = session_get(ms.mid) or {}
-                d["refer"] = str(ms.v.value)
-                session_set(ms.mid, mi.user.id, d)
+                await session_update(ms.mid, mi.user.id, refer=str(ms.v.value))
                 await mi.response.send_message("Saved.", ephemeral=(mi.guild_id is not None))
         await i.response.send_modal(M(msg_id))
 
@@ -147,24 +153,20 @@ class ApplicationFormView(discord.ui.View):
                        options=[discord.SelectOption(label=x) for x in ["Army","Navy","Marines","Air Force","Coast Guard","Space Force","Family"]],
                        custom_id="app:branch")
     async def branch_sel(self, i: discord.Interaction, sel: discord.ui.Select):
-        d = session_get(i.message.id) or {}
-        d["branch_choice"] = sel.values[0]
-        session_set(i.message.id, i.user.id, d)
+        await session_update(i.message.id, i.user.id, branch_choice=sel.values[0])
         await i.response.defer()
 
     @discord.ui.select(placeholder="Select your status",
                        options=[discord.SelectOption(label=x) for x in ["Current","Former","DEP/Future Warrior"]],
                        custom_id="app:status")
     async def status_sel(self, i: discord.Interaction, sel: discord.ui.Select):
-        d = session_get(i.message.id) or {}
-        d["status_choice"] = sel.values[0]
-        session_set(i.message.id, i.user.id, d)
+        await session_update(i.message.id, i.user.id, status_choice=sel.values[0])
         await i.response.defer()
 
     @discord.ui.button(label="Submit", style=discord.ButtonStyle.success, custom_id="app:submit")
     async def submit_btn(self, i: discord.Interaction, _: discord.ui.Button):
         try:
-            data = session_get(i.message.id) or {}
+            data = await session_get(i.message.id) or {}
             missing = [k for k in ("name","pronouns","refer","branch_choice","status_choice") if not data.get(k)]
             if missing:
                 await i.response.send_message("Missing: " + ", ".join(m.replace("_"," ") for m in missing), ephemeral=False)
@@ -187,10 +189,10 @@ class ApplicationFormView(discord.ui.View):
 
             if staff_ch:
                 review_msg = await staff_ch.send(embed=embed, view=ApplicationReviewView(i.user.id, data))
-                store_pending_application(review_msg.id, i.user.id, data)
+                await store_pending_application(review_msg.id, i.user.id, data)
 
-            mark_as_submitted(i.user.id, discord.utils.utcnow().isoformat())
-            session_del(i.message.id)
+            await mark_as_submitted(i.user.id, discord.utils.utcnow().isoformat())
+            await session_del(i.message.id)
 
             for c in self.children:
                 c.disabled = True
@@ -212,14 +214,14 @@ class ApplicationView(discord.ui.View):
 
     @discord.ui.button(label="Apply", style=discord.ButtonStyle.primary, custom_id="app:open")
     async def apply(self, interaction: discord.Interaction, _: discord.ui.Button):
-        if has_submitted(interaction.user.id):
+        if await has_submitted(interaction.user.id):
             await interaction.response.send_message("You already submitted.", ephemeral=True)
             return
         try:
             dm = await interaction.user.create_dm()
             msg = await dm.send("Let's begin your application!", view=ApplicationFormView())
             # store server id
-            session_set(msg.id, interaction.user.id, {"guild_id": interaction.guild.id})
+            await session_set(msg.id, interaction.user.id, {"guild_id": interaction.guild.id})
             await interaction.response.send_message("Check your DMs.", ephemeral=True)
         except discord.Forbidden:
             await interaction.response.send_message("Enable DMs and try again.", ephemeral=True)
@@ -274,7 +276,7 @@ class ApplicationReviewView(discord.ui.View):
                         except discord.Forbidden: pass
                     name = (self.data.get("name") or "").strip()
                     pronouns = (self.data.get("pronouns") or "").strip()
-                    delete_pending(user_id=member.id, message_id=interaction.message.id)
+                    await delete_pending(user_id=member.id, message_id=interaction.message.id)
                     nickname = build_application_nickname(name, pronouns)
                     if nickname:
                         try:
@@ -301,7 +303,7 @@ class ApplicationReviewView(discord.ui.View):
                 file = discord.File(io.BytesIO(buf.read().encode()), filename=f"{member.id}_app_log.csv")
                 log = guild.get_channel(TICKET_LOG_CHANNEL_ID)
                 if log: await log.send(f"Application log for {member.mention}", file=file)
-                delete_pending(message_id=interaction.message.id)
+                await delete_pending(message_id=interaction.message.id)
         await interaction.response.send_modal(Reason())
 
     async def _ticket(self, interaction: discord.Interaction):
@@ -323,9 +325,8 @@ class ApplicationReviewView(discord.ui.View):
             topic=f"Application of {member.display_name}")
         await ch.send(f"{member.mention}, a staff member will assist you shortly.", view=TicketCloseView())
         await interaction.response.send_message(f"Ticket created: {ch.mention}", ephemeral=True)
-        with sqlite3.connect(DB_PATH) as con:
-            con.execute("INSERT OR REPLACE INTO tickets(message_id,channel_id) VALUES(?,?)",
-                        (interaction.message.id, ch.id)); con.commit()
+        await db.execute("INSERT OR REPLACE INTO tickets(message_id,channel_id) VALUES(?,?)",
+                         (interaction.message.id, ch.id))
 
 class TicketCloseView(discord.ui.View):
     def __init__(self): super().__init__(timeout=None)
@@ -334,11 +335,14 @@ class TicketCloseView(discord.ui.View):
         class Close(discord.ui.Modal, title="Close Ticket"):
             reason = discord.ui.TextInput(label="Reason for closing", style=discord.TextStyle.paragraph, required=True)
             async def on_submit(ms, mi: discord.Interaction):
-                messages = [m async for m in interaction.channel.history(limit=1000, oldest_first=True)]
-                rows = [{"Author": f"{m.author} ({m.author.id})", "Content": m.content,
-                         "Time": m.created_at.isoformat()} for m in messages if not m.author.bot]
                 buf = io.StringIO(); w = csv.DictWriter(buf, fieldnames=["Author","Content","Time"])
-                w.writeheader(); w.writerows(rows); buf.seek(0)
+                w.writeheader()
+                # a failed read must raise here, before the channel is deleted below
+                async for m in interaction.channel.history(limit=1000, oldest_first=True):
+                    if not m.author.bot:
+                        w.writerow({"Author": f"{m.author} ({m.author.id})", "Content": m.content,
+                                    "Time": m.created_at.isoformat()})
+                buf.seek(0)
                 file = discord.File(io.BytesIO(buf.read().encode()),
                                     filename=f"{str(mi.user).replace('#','_')}_ticket_log.csv")
                 log = interaction.guild.get_channel(TICKET_LOG_CHANNEL_ID)
@@ -351,13 +355,16 @@ class TicketCloseView(discord.ui.View):
 class Applications(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        init_db()
 
     async def cog_load(self):
+        await init_db()
         self.bot.add_view(ApplicationView())
         self.bot.add_view(ApplicationFormView())
         self.bot.add_view(TicketCloseView())
 
+    async def cog_unload(self):
+        await db.close()
+
     @app_commands.command(name="app_repost", description="Repost the application button")
     @app_commands.describe(channel="Target channel")
     async def app_repost(self, interaction: Interaction, channel: discord.TextChannel | None = None):
@@ -374,15 +381,14 @@ class Applications(commands.Cog):
         ch = interaction.client.get_channel(STAFF_REVIEW_CHANNEL_ID)
         if not ch:
             await interaction.response.send_message("Channel not found.", ephemeral=True); return
-        with sqlite3.connect(DB_PATH) as con:
-            row = con.execute("SELECT user_id,data FROM pending_applications WHERE message_id=?", (mid,)).fetchone()
+        row = await db.fetchone("SELECT user_id,data FROM pending_applications WHERE message_id=?", (mid,))
         if not row:
             try:
                 msg = await ch.fetch_message(mid)
                 emb = msg.embeds[0]; data = {}
                 for f in emb.fields: data[f.name.lower().replace(" ","_")] = f.value
                 uid = int((emb.footer.text or "").split("(")[-1].rstrip(")"))
-                store_pending_application(mid, uid, data); row = (uid, json.dumps(data))
+                await store_pending_application(mid, uid, data); row = (uid, json.dumps(data))
             except Exception as e:
                 await interaction.response.send_message(f"Could not backfill: {e}", ephemeral=True); return
         uid, data_json = row
@@ -394,8 +400,7 @@ class Applications(commands.Cog):
 
     @app_commands.command(name="list_pending", description="List pending application message IDs")
     async def list_pending(self, interaction: Interaction):
-        with sqlite3.connect(DB_PATH) as con:
-            rows = con.execute("SELECT message_id,user_id FROM pending_applications ORDER BY message_id DESC").fetchall()
+        rows = await db.fetchall("SELECT message_id,user_id FROM pending_applications ORDER BY message_id DESC")
         if not rows:
             await interaction.response.send_message("No pending applications.", ephemeral=True); return
         await interaction.response.send_message("\n".join(f"{m} — {u}" for m,u in rows[:50]), ephemeral=True)
@@ -406,7 +411,7 @@ class Applications(commands.Cog):
         try: mid = int(message_id)
         except ValueError:
             await interaction.response.send_message("Invalid message ID.", ephemeral=True); return
-        delete_pending(message_id=mid)
+        await delete_pending(message_id=mid)
         await interaction.response.send_message("Removed.", ephemeral=True)
 
     async def send_followup_reminders(self):
@@ -1,5 +1,4 @@
 import math
-import matplotlib.pyplot as plt
 from io import BytesIO
 
 import discord
@@ -82,6 +81,7 @@ class E2Simulator(commands.Cog):
             else self._sim_first_order(data["params"], dose, interval, duration)
         )
 
+        import matplotlib.pyplot as plt
         fig, ax = plt.subplots()
         ax.plot(times, conc, lw=2)
         ax.set_title(f"{labels[injection]} — {dose} mg q{interval} h")
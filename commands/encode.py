@@ -7,6 +7,7 @@ import json
 import io
 import random
 from cryptography.fernet import Fernet
+from utils.persist import JsonWriter
 
 GPG_HOME = os.path.expanduser("~/.gnupg")
 gpg = gnupg.GPG(gnupghome=GPG_HOME)
@@ -21,6 +22,12 @@ class GPGEnc(commands.Cog):
         self.bot = bot
         self.user_keys = self._load_json(KEY_FILE)
         self.gpg_users = self._load_json(MAP_FILE)
+        self._key_writer = JsonWriter(KEY_FILE)
+        self._map_writer = JsonWriter(MAP_FILE)
+
+    async def cog_unload(self):
+        await self._key_writer.flush()
+        await self._map_writer.flush()
 
     def _load_json(self, path):
         if os.path.exists(path):
@@ -28,15 +35,13 @@ class GPGEnc(commands.Cog):
                 return json.load(f)
         return {}
 
-    def _save_json(self, path, data):
-        with open(path, "w") as f:
-            json.dump(data, f)
-
     def save_keys(self):
-        self._save_json(KEY_FILE, self.user_keys)
+        # on disk before the key is handed out: a key lost in a crash can't decrypt what it encoded
+        self._key_writer.save(self.user_keys)
+        self._key_writer.flush_sync()
 
     def save_gpgmap(self):
-        self._save_json(MAP_FILE, self.gpg_users)
+        self._map_writer.save(self.gpg_users)
 
     def get_cipher(self, user_id: int) -> Fernet:
         if str(user_id) not in self.user_keys:
@@ -17,25 +17,25 @@ from utils.risk_roster import (
 from discord.ui import View, Select, Modal, TextInput
 import discord, random, json
 from io import BytesIO
-from PIL import Image
 import random
 from discord import app_commands, Interaction, File, TextChannel, Member
 from discord.ui import View, Select, Modal, TextInput
 import aiohttp
 import os
-import requests
-import openai
 from datetime import datetime, timezone, timedelta
-import io
-import csv
-from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import subprocess
 import asyncio, re, fnmatch
 from typing import Literal
 from pathlib import Path
+from commands.message_index import get_index, to_record
+from utils.message_index import snowflake_at
+from utils.crawler import crawl_channels, paced_history
+from utils.csv_sink import CsvSink
+from utils.persist import JsonWriter
+from utils.match_executor import MatchExecutor, MATCH_BATCH
+from utils.scan_jobs import ScanJob
 load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO")
 
@@ -44,6 +44,7 @@ _FRAME_DURATION = 60  # ms per frame
 
 OUT_OF_OFFICE_FILE = Path("data/out_of_office.json")
 OUT_OF_OFFICE: dict[str, dict[str, str]] = {}
+_out_of_office_writer = JsonWriter(OUT_OF_OFFICE_FILE, indent=2)
 
 
 def load_out_of_office() -> dict[str, dict[str, str]]:
@@ -65,10 +66,8 @@ def load_out_of_office() -> dict[str, dict[str, str]]:
 
 
 def save_out_of_office() -> None:
-    """Persist the current out-of-office cache to disk."""
-    OUT_OF_OFFICE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with OUT_OF_OFFICE_FILE.open("w", encoding="utf-8") as f:
-        json.dump(OUT_OF_OFFICE, f, indent=2)
+    """Persist the current out-of-office cache to disk (debounced)."""
+    _out_of_office_writer.save(OUT_OF_OFFICE)
 
 
 def set_out_of_office(user_id: int, message: str) -> None:
@@ -335,6 +334,40 @@ async def trace_act(interaction: Interaction, days: int, log_channel: TextChanne
         await interaction.followup.send("Unable to resolve bot permissions for this guild.", ephemeral=True)
         return
 
+    accessible_channels = [
+        channel
+        for channel in guild.text_channels
+        if channel.permissions_for(bot_member).read_message_history
+    ]
+    if not accessible_channels:
+        await interaction.followup.send("No readable text channels were found for the bot.", ephemeral=True)
+        return
+
+    job = ScanJob.create("trace_act", guild.id, interaction.user.id, [c.id for c in accessible_channels],
+                         {"days": days, "cutoff": cutoff.isoformat(), "log_channel_id": log_channel.id})
+    await run_trace_act(interaction, job)
+
+
+async def run_trace_act(interaction: Interaction, job: ScanJob):
+    """Crawl (or keep crawling) a trace_act job's channels, then post the report."""
+    if not job.claim():
+        await interaction.followup.send(f"Scan `{job.id}` is already running.", ephemeral=True)
+        return
+    try:
+        await _run_trace_act(interaction, job)
+    finally:
+        job.release()
+
+
+async def _run_trace_act(interaction: Interaction, job: ScanJob):
+    guild = interaction.guild
+    days = job.params["days"]
+    cutoff = datetime.fromisoformat(job.params["cutoff"])
+    log_channel = guild.get_channel(job.params["log_channel_id"])
+    if log_channel is None:
+        await interaction.followup.send("The log channel for this scan no longer exists.", ephemeral=True)
+        return
+
     if not guild.chunked and guild.member_count and len(guild.members) < guild.member_count:
         try:
             await guild.chunk()
@@ -355,83 +388,101 @@ async def trace_act(interaction: Interaction, days: int, log_channel: TextChanne
         filled = percent // 10
         return "[" + "█" * filled + "░" * (10 - filled) + f"] {percent}%"
 
-    accessible_channels = [
-        channel
-        for channel in guild.text_channels
-        if channel.permissions_for(bot_member).read_message_history
-    ]
-    total_channels = len(accessible_channels)
-    if total_channels == 0:
-        await interaction.followup.send("No readable text channels were found for the bot.", ephemeral=True)
-        return
+    channels = [ch for cid in job.pending_channels() if (ch := guild.get_channel(cid)) is not None]
+    total_channels = len(job.channel_ids)
+    scanned_channels = total_channels - len(channels)
 
     progress_msg = await interaction.followup.send(
-        f"Scanning channels… {build_bar(0, total_channels)}",
+        f"Scanning channels… {build_bar(scanned_channels, total_channels)}\n"
+        f"Job `{job.id}`: if the bot restarts, continue with `/scan resume`.",
         ephemeral=True
     )
 
-    activity_map: dict[int, datetime] = {}
-    skipped_channels: list[str] = []
-    scanned_channels = 0
-
-    for channel in accessible_channels:
-        try:
-            async for msg in channel.history(limit=None, after=cutoff, oldest_first=False):
-                if not msg.author:
-                    continue
-                last_seen = activity_map.get(msg.author.id)
-                if last_seen is None or msg.created_at > last_seen:
-                    activity_map[msg.author.id] = msg.created_at
-        except discord.Forbidden:
-            skipped_channels.append(f"#{channel.name}")
-        except discord.HTTPException:
+    activity_map: dict[int, datetime] = {
+        int(aid): datetime.fromisoformat(ts) for aid, ts in job.state.get("activity", {}).items()
+    }
+    skipped_channels: list[str] = list(job.state.get("skipped", []))
+    seen: dict[int, int] = {}
+    finished: set[int] = set()
+    index = get_index(interaction.client)
+
+    def checkpoint():
+        job.checkpoint(seen, finished, skipped=skipped_channels,
+                       activity={str(aid): ts.isoformat() for aid, ts in activity_map.items()})
+
+    async def activity(channel):
+        if index:
+            after_id = snowflake_at(cutoff)
+            await index.sync_channel(channel, after_id=after_id)
+            last = await index.index.last_seen(channel.id, after_id=after_id)
+            for author_id, created_at in last.items():
+                yield None, author_id, created_at
+        else:
+            cursor = job.cursor(channel.id)
+            after = discord.Object(id=cursor) if cursor else cutoff
+            async for msg in paced_history(channel, after=after, oldest_first=True):
+                if msg.author:
+                    yield msg.id, msg.author.id, msg.created_at
+
+    def record(channel, item):
+        message_id, author_id, created_at = item
+        last_seen = activity_map.get(author_id)
+        if last_seen is None or created_at > last_seen:
+            activity_map[author_id] = created_at
+        if message_id:
+            seen[channel.id] = message_id
+        if job.due():
+            checkpoint()
+
+    async def channel_done(channel, ok):
+        nonlocal scanned_channels
+        if not ok:
             skipped_channels.append(f"#{channel.name}")
-
+        finished.add(channel.id)
         scanned_channels += 1
+        if job.due():
+            checkpoint()
         if scanned_channels % max(1, total_channels // 20) == 0 or scanned_channels == total_channels:
             await progress_msg.edit(content=f"Scanning channels… {build_bar(scanned_channels, total_channels)}")
 
-        await asyncio.sleep(0.2)
+    await crawl_channels(channels, record, source=activity, on_channel_done=channel_done)
+    checkpoint()
 
     await progress_msg.edit(content="Building report…")
 
     inactive_members = []
-    csv_buffer = io.StringIO()
-    writer = csv.writer(csv_buffer)
-    writer.writerow(["Member", "ID", "Status", "Last Seen (UTC)"])
-
-    for member in members:
-        last_seen = activity_map.get(member.id)
-        if last_seen is None:
-            inactive_members.append(member)
-            writer.writerow([str(member), member.id, "Inactive", "N/A"])
-        else:
-            if last_seen.tzinfo is None:
-                last_seen = last_seen.replace(tzinfo=timezone.utc)
-            writer.writerow([
-                str(member),
-                member.id,
-                "Active",
-                last_seen.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
-            ])
-
-    csv_buffer.seek(0)
-    file = File(fp=io.BytesIO(csv_buffer.read().encode()), filename="inactive_members.csv")
-
-    summary_lines = [
-        f"Inactive (> {days}d): {len(inactive_members)}/{total_members}",
-        f"Channels scanned: {scanned_channels}/{total_channels}",
-    ]
-    if skipped_channels:
-        summary_lines.append(f"Skipped {len(skipped_channels)} channels (no access).")
+    with CsvSink(["Member", "ID", "Status", "Last Seen (UTC)"], "inactive_members.csv") as sink:
+        for member in members:
+            last_seen = activity_map.get(member.id)
+            if last_seen is None:
+                inactive_members.append(member)
+                sink.writerow([str(member), member.id, "Inactive", "N/A"])
+            else:
+                if last_seen.tzinfo is None:
+                    last_seen = last_seen.replace(tzinfo=timezone.utc)
+                sink.writerow([
+                    str(member),
+                    member.id,
+                    "Active",
+                    last_seen.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"),
+                ])
+
+        summary_lines = [
+            f"Inactive (> {days}d): {len(inactive_members)}/{total_members}",
+            f"Channels scanned: {scanned_channels}/{total_channels}",
+        ]
+        if skipped_channels:
+            summary_lines.append(f"Skipped {len(skipped_channels)} channels (no access).")
 
-    try:
-        await log_channel.send("\n".join(summary_lines), file=file)
-        await progress_msg.edit(content="Audit complete! Report posted.")
-    except discord.Forbidden:
-        await progress_msg.edit(
-            content="Audit complete, but I could not post in the selected log channel."
-        )
+        try:
+            await sink.send(log_channel.send, "\n".join(summary_lines), limit=guild.filesize_limit)
+            await progress_msg.edit(content="Audit complete! Report posted.")
+            job.discard()
+        except discord.Forbidden:
+            await progress_msg.edit(
+                content="Audit complete, but I could not post in the selected log channel. "
+                        "Fix its permissions and run `/scan resume` to post the report."
+            )
 
 
 @app_commands.command(
@@ -445,6 +496,8 @@ async def rennygadetarget(
     interaction: Interaction,
     user: Member
 ):
+    from PIL import Image
+
     await interaction.response.defer()
 
     avatar_url = user.display_avatar.with_format("png").with_size(256).url
@@ -553,77 +606,121 @@ async def attach_search(
     if days:
         cutoff_after = datetime.now(timezone.utc) - timedelta(days=int(days))
 
-    rows = []
+    sink = CsvSink(["message_id", "author_id", "author", "created", "filename",
+                    "size_bytes", "content_type", "url", "jump_url"],
+                   f"attach_search_{channel.id}.csv")
     scanned = 0
     progress = await interaction.followup.send("Scanning… 0%", ephemeral=True)
 
-    async for msg in channel.history(limit=int(limit), oldest_first=False, after=cutoff_after):
-        scanned += 1
-        if author and msg.author.id != author.id:
-            if scanned % 250 == 0:
-                await progress.edit(content=f"Scanning… {scanned}/{limit}")
-            continue
-        if not msg.attachments:
-            if scanned % 250 == 0:
-                await progress.edit(content=f"Scanning… {scanned}/{limit}")
-            continue
+    async def records():
+        index = get_index(interaction.client)
+        if index:
+            after_id = snowflake_at(cutoff_after) if cutoff_after else 0
+            async for page in index.messages(channel, after_id=after_id, newest_first=True, limit=int(limit)):
+                for rec in page:
+                    yield rec
+        else:
+            async for m in channel.history(limit=int(limit), oldest_first=False, after=cutoff_after):
+                yield to_record(m)
+
+    def write(msg, a, name):
+        jump = f"https://discord.com/channels/{channel.guild.id}/{channel.id}/{msg.id}"
+        sink.writerow([
+            str(msg.id),
+            str(msg.author_id),
+            msg.author_name,
+            msg.created_at.replace(tzinfo=timezone.utc).isoformat(),
+            name,
+            a.size,
+            a.content_type or "",
+            a.url,
+            jump,
+        ])
+
+    # regex mode runs in worker processes so a pathological pattern can't stall the bot
+    regex = None
+    pending = []
+    if query and match == "regex":
+        try:
+            regex = MatchExecutor([re.compile(query if case_sensitive else query.lower(),
+                                              0 if case_sensitive else re.IGNORECASE)])
+        except re.error:
+            pass
 
-        for a in msg.attachments:
-            name = a.filename or ""
-            if exts and not any(name.lower().endswith(x) for x in exts):
-                continue
-            if min_kb is not None and (a.size or 0) < (min_kb * 1024):
-                continue
-            if max_kb is not None and (a.size or 0) > (max_kb * 1024):
+    async def run_batch():
+        nonlocal pending
+        batch, pending = pending, []
+        if regex is None or not batch:
+            return
+        results = await regex.match([name if case_sensitive else name.lower() for _, _, name in batch])
+        for (msg, a, name), hits in zip(batch, results):
+            if hits:
+                write(msg, a, name)
+
+    try:
+        async for msg in records():
+            scanned += 1
+            if author and msg.author_id != author.id:
+                if scanned % 250 == 0:
+                    await progress.edit(content=f"Scanning… {scanned}/{limit}")
                 continue
-            if query and not _attach_match(name, query, match, case_sensitive):
+            if not msg.attachments:
+                if scanned % 250 == 0:
+                    await progress.edit(content=f"Scanning… {scanned}/{limit}")
                 continue
-            jump = f"https://discord.com/channels/{msg.guild.id}/{msg.channel.id}/{msg.id}"
-            rows.append({
-                "message_id": str(msg.id),
-                "author_id": str(msg.author.id),
-                "author": str(msg.author),
-                "created": msg.created_at.replace(tzinfo=timezone.utc).isoformat(),
-                "filename": name,
-                "size_bytes": a.size,
-                "content_type": a.content_type or "",
-                "url": a.url,
-                "jump_url": jump,
-            })
 
-        if scanned % 250 == 0:
-            await progress.edit(content=f"Scanning… {scanned}/{limit}")
-            await asyncio.sleep(0)
-
-    await progress.edit(content=f"Done. Matches: {len(rows)}")
+            for a in msg.attachments:
+                name = a.filename or ""
+                if exts and not any(name.lower().endswith(x) for x in exts):
+                    continue
+                if min_kb is not None and (a.size or 0) < (min_kb * 1024):
+                    continue
+                if max_kb is not None and (a.size or 0) > (max_kb * 1024):
+                    continue
+                if query and match == "regex":
+                    pending.append((msg, a, name))
+                    continue
+                if query and not _attach_match(name, query, match, case_sensitive):
+                    continue
+                write(msg, a, name)
 
-    if not rows:
-        await interaction.followup.send("No matches.", ephemeral=True)
-        return
+            if len(pending) >= MATCH_BATCH:
+                await run_batch()
+            if scanned % 250 == 0:
+                await progress.edit(content=f"Scanning… {scanned}/{limit}")
+                await asyncio.sleep(0)
+        await run_batch()
+    finally:
+        if regex is not None:
+            regex.close()
+
+    with sink:
+        await progress.edit(content=f"Done. Matches: {sink.rows}")
+
+        if not sink.rows:
+            timed_out = regex is not None and regex.pathological
+            await interaction.followup.send("The regex timed out." if timed_out else "No matches.", ephemeral=True)
+            return
 
-    buf = io.StringIO()
-    writer = csv.DictWriter(buf, fieldnames=list(rows[0].keys()))
-    writer.writeheader()
-    writer.writerows(rows)
-    data = io.BytesIO(buf.getvalue().encode("utf-8"))
-    out = discord.File(data, filename=f"attach_search_{channel.id}.csv")
-
-    summary = (f"Attachment search in {channel.mention}\n"
-               f"Query: {query or '(none)'} | Mode: {match}"
-               + (f" | Ext: {','.join(sorted(exts))}" if exts else "")
-               + (f" | Size: {min_kb or 0}–{max_kb or '∞'} KB" if (min_kb is not None or max_kb is not None) else "")
-               + (f" | Author: {author.mention}" if author else "")
-               + (f" | Days: {days}" if days else "")
-               + f"\nMatches: {len(rows)}")
-
-    if log_channel:
-        try:
-            await log_channel.send(summary, file=out, allowed_mentions=discord.AllowedMentions.none())
-            await interaction.followup.send("Posted results to the log channel.", ephemeral=True)
-        except discord.Forbidden:
-            await interaction.followup.send("No permission to post in the log channel.", ephemeral=True)
-    else:
-        await interaction.followup.send(summary, file=out, ephemeral=True)
+        summary = (f"Attachment search in {channel.mention}\n"
+                   f"Query: {query or '(none)'} | Mode: {match}"
+                   + (f" | Ext: {','.join(sorted(exts))}" if exts else "")
+                   + (f" | Size: {min_kb or 0}–{max_kb or '∞'} KB" if (min_kb is not None or max_kb is not None) else "")
+                   + (f" | Author: {author.mention}" if author else "")
+                   + (f" | Days: {days}" if days else "")
+                   + f"\nMatches: {sink.rows}"
+                   + ("\nThe regex timed out and was abandoned; results are incomplete."
+                      if regex is not None and regex.pathological else ""))
+
+        if log_channel:
+            try:
+                await sink.send(log_channel.send, summary, limit=log_channel.guild.filesize_limit,
+                                allowed_mentions=discord.AllowedMentions.none())
+                await interaction.followup.send("Posted results to the log channel.", ephemeral=True)
+            except discord.Forbidden:
+                await interaction.followup.send("No permission to post in the log channel.", ephemeral=True)
+        else:
+            await sink.send(interaction.followup.send, summary, limit=channel.guild.filesize_limit, ephemeral=True)
 
 
 class RiskRosterSelect(Select):
@@ -5,20 +5,125 @@ from typing import Literal
 import discord
 from discord import app_commands, Interaction
 from discord.ext import commands
+from utils.keyword_index import RuleIndex
+from utils.cooldowns import CooldownTable
+from utils.persist import JsonWriter
 
 STORE = Path(os.getenv("KEYWORD_ALERTS_PATH") or Path(__file__).resolve().parents[1] / "data" / "keyword_alerts.json")
 STORE.parent.mkdir(parents=True, exist_ok=True)
 
+FLUSH_SECONDS = float(os.getenv("KEYWORD_ALERT_FLUSH_SECONDS", "3"))
+BATCH_SIZE = int(os.getenv("KEYWORD_ALERT_BATCH_SIZE", "10"))
+MSG_LIMIT = 1990
+
 def _now(): return discord.utils.utcnow().isoformat()
 
+class AlertDispatcher:
+    """Queues alerts per output channel and sends each batch as one digest.
+
+    A channel's queue is flushed FLUSH_SECONDS after its first alert, or as
+    soon as it holds BATCH_SIZE alerts.
+    """
+
+    def __init__(self, flush_after: float = FLUSH_SECONDS, batch_size: int = BATCH_SIZE):
+        self.flush_after = flush_after
+        self.batch_size = max(1, batch_size)
+        self._pending: dict[int, tuple[discord.abc.Messageable, list[tuple[str, str]]]] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._flushing: set[asyncio.Task] = set()
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._staff: dict[int, discord.Role | None] = {}
+
+    def __len__(self) -> int:
+        return sum(len(items) for _, items in self._pending.values())
+
+    def staff_role(self, guild: discord.Guild) -> discord.Role | None:
+        if guild.id not in self._staff:
+            self._staff[guild.id] = discord.utils.get(guild.roles, name="Staff")
+        return self._staff[guild.id]
+
+    def forget_role(self, guild_id: int):
+        self._staff.pop(guild_id, None)
+
+    def queue(self, channel: discord.abc.GuildChannel, header: str, body: str):
+        cid = channel.id
+        entry = self._pending.setdefault(cid, (channel, []))
+        entry[1].append((header, body))
+        if len(entry[1]) >= self.batch_size:
+            timer = self._timers.pop(cid, None)
+            if timer: timer.cancel()
+            task = asyncio.create_task(self.flush(cid))
+            self._flushing.add(task)
+            task.add_done_callback(self._flushing.discard)
+        elif cid not in self._timers:
+            self._timers[cid] = asyncio.create_task(self._flush_later(cid))
+
+    async def _flush_later(self, cid: int):
+        await asyncio.sleep(self.flush_after)
+        self._timers.pop(cid, None)
+        await self.flush(cid)
+
+    async def flush(self, cid: int):
+        entry = self._pending.pop(cid, None)
+        if not entry: return
+        channel, items = entry
+        role = self.staff_role(channel.guild)
+        am = None
+        if role:
+            am = discord.AllowedMentions(everyone=False, users=False, roles=[role], replied_user=False)
+        lock = self._locks.setdefault(cid, asyncio.Lock())
+        async with lock:
+            for content in self._render(items, role):
+                try:
+                    await channel.send(content, allowed_mentions=am)
+                except Exception:
+                    pass
+
+    def _render(self, items: list[tuple[str, str]], role: discord.Role | None) -> list[str]:
+        if len(items) == 1:
+            header, body = items[0]
+            parts = [f"{header}\n\n{body[:1500]}"]
+        else:
+            parts = [f"{header}\n{body[:300]}" for header, body in items]
+            parts[0] = f"Keyword digest: {len(items)} matches\n\n{parts[0]}"
+        if role:
+            parts[0] = f"{role.mention}\n{parts[0]}"
+        out: list[str] = []
+        cur = ""
+        for part in parts:
+            part = part[:MSG_LIMIT]
+            if cur and len(cur) + 2 + len(part) > MSG_LIMIT:
+                out.append(cur)
+                cur = part
+            else:
+                cur = f"{cur}\n\n{part}" if cur else part
+        if cur: out.append(cur)
+        return out
+
+    async def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
+        for cid in list(self._pending):
+            await self.flush(cid)
+
 class KeywordAlerts(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
         self._lock = asyncio.Lock()
         self._data = {"guilds": {}}
-        self._cool: dict[tuple[int,int,int], float] = {}
+        self._cool = CooldownTable()
+        self._index: dict[int, RuleIndex] = {}
+        self._dispatch = AlertDispatcher()
+        self._store = JsonWriter(STORE, indent=2)
         self._load()
 
+    async def cog_unload(self):
+        await self._dispatch.close()
+        await self._store.flush()
+
     def _load(self):
         if STORE.exists():
             try: self._data = json.loads(STORE.read_text(encoding="utf-8"))
@@ -26,8 +131,7 @@ class KeywordAlerts(commands.Cog):
         if "guilds" not in self._data: self._data = {"guilds": {}}
 
     async def _save(self):
-        txt = json.dumps(self._data, ensure_ascii=False, indent=2)
-        await asyncio.to_thread(STORE.write_text, txt, "utf-8")
+        self._store.save(self._data)
 
     def _g(self, gid: int) -> dict:
         s = self._data["guilds"].get(str(gid))
@@ -36,6 +140,16 @@ class KeywordAlerts(commands.Cog):
             self._data["guilds"][str(gid)] = s
         return s
 
+    def _reindex(self, gid: int) -> RuleIndex:
+        g = self._data["guilds"].get(str(gid)) or {}
+        idx = RuleIndex(g.get("rules") or [])
+        self._index[gid] = idx
+        return idx
+
+    @property
+    def cooldown_size(self) -> int:
+        return len(self._cool)
+
     keyword = app_commands.Group(name="keyword", description="Keyword tools")
     alerts = app_commands.Group(name="alert", description="Manage keyword alerts", parent=keyword)
 
@@ -84,6 +198,7 @@ class KeywordAlerts(commands.Cog):
                 except re.error as e:
                     await i.followup.send(f"Invalid regex: {e}", ephemeral=True); return
             g["rules"].append(rule)
+            self._reindex(i.guild_id)
             await self._save()
         await i.followup.send(f"Rule #{rid} added → {channel.mention}", ephemeral=True)
 
@@ -96,7 +211,9 @@ class KeywordAlerts(commands.Cog):
             before = len(g["rules"])
             g["rules"] = [r for r in g["rules"] if int(r.get("id",0)) != id]
             ok = len(g["rules"]) != before
-            if ok: await self._save()
+            if ok:
+                self._reindex(i.guild_id)
+                await self._save()
         await i.followup.send("Removed." if ok else "Not found.", ephemeral=True)
 
     @alerts.command(name="list", description="List rules")
@@ -115,74 +232,46 @@ class KeywordAlerts(commands.Cog):
                        + (f" • bots" if r.get('include_bots') else "")
                        + f" • cd:{r.get('cooldown',20)}s")
         txt = "\n".join(out)
-        await i.followup.send(txt[:1900] if len(txt)<=1900 else txt[:1900]+"…", ephemeral=True)
-
-    def _match(self, r: dict, m: discord.Message) -> bool:
-        if r.get("scope_channel_id") and int(r["scope_channel_id"]) != m.channel.id:
-            return False
-        if not r.get("include_bots") and m.author.bot:
-            return False
-
-        text = m.content or ""
-        phrase = r["phrase"]
-        case_sensitive = r.get("case", False)
-        match_type = r.get("match", "contains")
-
-        flags = 0 if case_sensitive else re.IGNORECASE
-
-        if match_type == "exact":
-            return text == phrase if case_sensitive else text.lower() == phrase.lower()
-
-        elif match_type == "contains":
-            pattern = rf"\b{re.escape(phrase)}\b"
-            return re.search(pattern, text, flags) is not None
-
-        elif match_type == "regex":
-            try:
-                return re.search(phrase, text, flags) is not None
-            except re.error:
-                return False
-
-        return False
+        txt = txt[:1900] if len(txt)<=1900 else txt[:1900]+"…"
+        await i.followup.send(f"{txt}\n\nActive cooldowns: {self.cooldown_size}", ephemeral=True)
 
     @commands.Cog.listener("on_message")
     async def _on_message(self, m: discord.Message):
         if not m.guild or not m.content: return
-        g = self._data["guilds"].get(str(m.guild.id))
-        if not g or not g.get("rules"): return
+        idx = self._index.get(m.guild.id)
+        if idx is None:
+            idx = self._reindex(m.guild.id)
+        if not idx.size: return
         now = discord.utils.utcnow().timestamp()
-        for r in g["rules"]:
+        for r in idx.match(m.content, m.channel.id, m.author.bot):
             try:
-                if not self._match(r, m): continue
                 key = (m.guild.id, int(r["id"]), m.channel.id)
                 cd = int(r.get("cooldown", 20))
-                last = self._cool.get(key, 0.0)
-                if now - last < cd: continue
-                self._cool[key] = now
+                if not self._cool.hit(key, now, cd): continue
                 out_ch = m.guild.get_channel(int(r["channel_id"]))
                 if not out_ch: continue
                 jump = f"https://discord.com/channels/{m.guild.id}/{m.channel.id}/{m.id}"
-                content = (f"Keyword match #{r['id']}\n"
-                           f"Author: {m.author} ({m.author.id})\n"
-                           f"Channel: {m.channel.mention}\n"
-                           f"Phrase: {r['phrase']} ({r['match']}{' cs' if r.get('case') else ''})\n"
-                           f"Link: {jump}\n\n"
-                           f"{m.content[:1500]}")
-
-                # ping Staff role only
-                role = discord.utils.get(m.guild.roles, name="Staff")
-                am = None
-                if role:
-                    content = f"{role.mention}\n{content}"
-                    am = discord.AllowedMentions(
-                        everyone=False, users=False, roles=[role], replied_user=False
-                    )
-
-                try:
-                    await out_ch.send(content, allowed_mentions=am)
-                except:pass
+                header = (f"Keyword match #{r['id']}\n"
+                          f"Author: {m.author} ({m.author.id})\n"
+                          f"Channel: {m.channel.mention}\n"
+                          f"Phrase: {r['phrase']} ({r['match']}{' cs' if r.get('case') else ''})\n"
+                          f"Link: {jump}")
+                self._dispatch.queue(out_ch, header, m.content)
             except Exception:
                 continue
 
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: discord.Role):
+        self._dispatch.forget_role(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self._dispatch.forget_role(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            self._dispatch.forget_role(after.guild.id)
+
 async def setup(bot: commands.Bot):
     await bot.add_cog(KeywordAlerts(bot))
@@ -0,0 +1,235 @@
+import os
+import asyncio
+from pathlib import Path
+import discord
+from discord import app_commands, Interaction
+from discord.ext import commands, tasks
+from utils.message_index import MessageIndex, IndexedMessage, IndexedAttachment
+from utils.crawler import crawl_channels, paced_history
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+INDEX_ENABLED = os.getenv("MESSAGE_INDEX") == "1"
+INDEX_PATH = Path(os.getenv("MESSAGE_INDEX_DB") or (BASE_DIR / "data" / "message_index.db"))
+SYNC_BATCH = 500
+
+
+def to_record(msg: discord.Message) -> IndexedMessage:
+    return IndexedMessage(
+        id=msg.id,
+        guild_id=msg.guild.id if msg.guild else None,
+        channel_id=msg.channel.id,
+        author_id=msg.author.id,
+        author_name=str(msg.author),
+        author_bot=bool(msg.author.bot),
+        created_at=msg.created_at,
+        content=msg.content or "",
+        attachments=[IndexedAttachment(a.filename or "", a.size or 0, a.content_type, a.url) for a in msg.attachments],
+    )
+
+
+async def history_records(channel: discord.abc.Messageable, **kwargs):
+    """channel.history(**kwargs) as IndexedMessage records, paced like a crawl."""
+    async for msg in paced_history(channel, **kwargs):
+        yield to_record(msg)
+
+
+def get_index(client: discord.Client) -> "MessageIndexCog | None":
+    """The running index cog, or None when the index is disabled."""
+    cog = client.get_cog("MessageIndexCog")
+    return cog if cog is not None and cog.index is not None else None
+
+
+class MessageIndexCog(commands.Cog):
+    """Opt-in local message index (MESSAGE_INDEX=1), fed live and synced on demand."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.index = MessageIndex(INDEX_PATH) if INDEX_ENABLED else None
+        self._pending: list[IndexedMessage] = []
+        self._sync_locks: dict[int, asyncio.Lock] = {}
+        if self.index:
+            self.flush_loop.start()
+
+    async def cog_unload(self):
+        if self.index:
+            self.flush_loop.cancel()
+            await self.flush()
+            self.index.close()
+
+    async def flush(self):
+        if not self._pending: return
+        batch, self._pending = self._pending, []
+        await self.index.store(batch)
+
+    @tasks.loop(seconds=2)
+    async def flush_loop(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"message index flush error: {e}")
+
+    async def _fetch(self, channel: discord.TextChannel, *, advance: bool, **history) -> tuple[int, int | None, int | None]:
+        """Store channel.history(**history); (messages fetched, oldest id, newest id).
+
+        With `advance` the history must be oldest first, and every stored batch
+        moves the high-water mark, so an interrupted backfill resumes where it stopped.
+        """
+        batch: list[IndexedMessage] = []
+        fetched = 0
+        oldest = newest = None
+        async for msg in paced_history(channel, **history):
+            batch.append(to_record(msg))
+            fetched += 1
+            oldest = msg.id if oldest is None else min(oldest, msg.id)
+            newest = msg.id if newest is None else max(newest, msg.id)
+            if len(batch) >= SYNC_BATCH:
+                await self.index.store(batch, high_water=batch[-1].id if advance else None,
+                                       channel_id=channel.id, guild_id=channel.guild.id)
+                batch = []
+        if batch:
+            await self.index.store(batch, high_water=batch[-1].id if advance else None,
+                                   channel_id=channel.id, guild_id=channel.guild.id)
+        return fetched, oldest, newest
+
+    async def sync_channel(self, channel: discord.TextChannel, *, after_id: int = 0, limit: int | None = None) -> int:
+        """Bring the channel's index up to date; returns how many messages were fetched.
+
+        Everything after the high-water mark is always fetched. Older history is
+        only backfilled as far as the caller reads: messages after `after_id`,
+        and of those only the newest `limit` when a limit is given.
+        """
+        lock = self._sync_locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            high, low = await self.index.window(channel.id)
+            state = dict(channel_id=channel.id, guild_id=channel.guild.id)
+            floor = discord.Object(id=after_id) if after_id else None
+
+            if high is None:
+                if limit is None:
+                    # record where the crawl starts before any batch moves the high mark, so an
+                    # interrupted first sync isn't taken for one that reached the channel start
+                    await self.index.store([], low_water=after_id, **state)
+                    fetched, _, _ = await self._fetch(channel, advance=True, limit=None, after=floor, oldest_first=True)
+                    # the batches moved the high mark; with nothing fetched it records the sync instead
+                    await self.index.store([], high_water=None if fetched else after_id, low_water=after_id, **state)
+                else:
+                    fetched, oldest, newest = await self._fetch(channel, advance=False, limit=limit, after=floor,
+                                                                oldest_first=False)
+                    low_water = oldest - 1 if fetched >= limit else after_id
+                    await self.index.store([], high_water=newest or after_id, low_water=low_water, **state)
+                return fetched
+
+            fetched, _, _ = await self._fetch(channel, advance=True, limit=None,
+                                              after=discord.Object(id=high) if high else None, oldest_first=True)
+            if low <= after_id:
+                return fetched
+            want = None
+            if limit is not None:
+                want = limit - await self.index.count(channel.id, after_id=low)
+                if want <= 0:
+                    return fetched
+            got, oldest, _ = await self._fetch(channel, advance=False, limit=want, after=floor,
+                                               before=discord.Object(id=low + 1), oldest_first=False)
+            low_water = oldest - 1 if want is not None and got >= want else after_id
+            await self.index.store([], low_water=low_water, **state)
+            return fetched + got
+
+    async def _sync_source(self, channel: discord.TextChannel):
+        yield await self.sync_channel(channel)
+
+    async def messages(self, channel: discord.TextChannel, **kwargs):
+        """Sync the part of the channel the read covers, then yield its indexed messages page by page."""
+        limit = kwargs.get("limit") if kwargs.get("newest_first") else None
+        await self.sync_channel(channel, after_id=kwargs.get("after_id") or 0, limit=limit)
+        async for page in self.index.iter_channel(channel.id, **kwargs):
+            yield page
+
+    async def records(self, channel: discord.TextChannel, **kwargs):
+        """Like messages(), one record at a time."""
+        async for page in self.messages(channel, **kwargs):
+            for rec in page:
+                yield rec
+
+    @commands.Cog.listener()
+    async def on_message(self, msg: discord.Message):
+        if self.index and msg.guild:
+            self._pending.append(to_record(msg))
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if not self.index: return
+        data = payload.data
+        atts = None
+        if "attachments" in data:
+            atts = [IndexedAttachment(a.get("filename") or "", a.get("size") or 0, a.get("content_type"), a.get("url") or "")
+                    for a in data["attachments"]]
+        if "content" in data or atts is not None:
+            await self.flush()
+            await self.index.edit(payload.message_id, content=data.get("content"), attachments=atts)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if not self.index: return
+        await self.flush()
+        await self.index.delete([payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if not self.index: return
+        await self.flush()
+        await self.index.delete(payload.message_ids)
+
+    msgindex = app_commands.Group(name="msgindex", description="Local message index")
+
+    @msgindex.command(name="status", description="Show how much of this server is indexed")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def status(self, interaction: Interaction):
+        if not self.index:
+            await interaction.response.send_message("Message index is disabled (set MESSAGE_INDEX=1).", ephemeral=True)
+            return
+        msgs, chans = await self.index.stats(interaction.guild_id)
+        await interaction.response.send_message(
+            f"Indexed messages: {msgs}\nChannels synced: {chans}/{len(interaction.guild.text_channels)}"
+            f"\nFull-text search: {'on' if self.index.fts else 'off'}",
+            ephemeral=True,
+        )
+
+    @msgindex.command(name="sync", description="Backfill the index from channel history")
+    @app_commands.describe(channel="Only sync this channel (default: every readable channel)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def sync(self, interaction: Interaction, channel: discord.TextChannel | None = None):
+        if not self.index:
+            await interaction.response.send_message("Message index is disabled (set MESSAGE_INDEX=1).", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        me = interaction.guild.me
+        channels = [channel] if channel else [c for c in interaction.guild.text_channels if c.permissions_for(me).read_message_history]
+        fetched = 0
+
+        def count(_, n):
+            nonlocal fetched
+            fetched += n
+
+        result = await crawl_channels(channels, count, source=self._sync_source)
+        await interaction.followup.send(
+            f"Synced {len(channels) - len(result.skipped)}/{len(channels)} channels, {fetched} new messages.", ephemeral=True)
+
+    @msgindex.command(name="search", description="Full-text search of indexed messages")
+    @app_commands.checks.has_permissions(manage_messages=True)
+    async def search(self, interaction: Interaction, query: str):
+        if not self.index:
+            await interaction.response.send_message("Message index is disabled (set MESSAGE_INDEX=1).", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        phrase = '"' + query.replace('"', '""') + '"' if self.index.fts else query
+        rows = await self.index.search(interaction.guild_id, phrase, limit=15)
+        if not rows:
+            await interaction.followup.send("No matches.", ephemeral=True); return
+        out = []
+        for m in rows:
+            jump = f"https://discord.com/channels/{interaction.guild_id}/{m.channel_id}/{m.id}"
+            out.append(f"<#{m.channel_id}> • <@{m.author_id}> • {m.created_at:%Y-%m-%d %H:%M}\n{m.content[:200]}\n{jump}")
+        await interaction.followup.send("\n\n".join(out)[:1990], ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MessageIndexCog(bot))
@@ -1,46 +1,68 @@
-import os, json, io, asyncio, math
-from pathlib import Path
-from typing import Any
+import json, io, math
 import discord
 from discord import app_commands, Interaction, File
 from discord.ext import commands
+from utils.note_store import NoteStore, open_store
 
-NOTES_PATH = Path(os.getenv("NOTES_JSON_PATH") or Path(__file__).resolve().parents[1] / "data" / "mod_notes.json")
-NOTES_PATH.parent.mkdir(parents=True, exist_ok=True)
 
 def _now(): return discord.utils.utcnow().isoformat()
 
+NOTES_PER_PAGE = 10
+
+
+class NotePageView(discord.ui.View):
+    """Prev/next buttons over a member's notes, paging by note id."""
+
+    def __init__(self, store: NoteStore, actor: discord.abc.User, guild_id: int, member: discord.abc.User,
+                 page: tuple[list[dict], int, int]):
+        super().__init__(timeout=300)
+        self.store = store
+        self.actor_id = actor.id
+        self.guild_id = guild_id
+        self.member = member
+        self._show(page)
+
+    def _show(self, page: tuple[list[dict], int, int]):
+        self.rows, self.start, self.total = page
+        self.prev_page.disabled = self.start == 0
+        self.next_page.disabled = self.start + len(self.rows) >= self.total
+
+    def render(self) -> str:
+        if not self.rows:
+            return "No notes found."
+        pages = max(1, math.ceil(self.total / NOTES_PER_PAGE))
+        # cursor paging can leave `start` off a page boundary, so go by the last row shown
+        page = min(pages, max(1, math.ceil((self.start + len(self.rows)) / NOTES_PER_PAGE)))
+        lines = []
+        for n in self.rows:
+            t = n["ts"].replace("T"," ").split(".")[0]
+            tag = f" [{', '.join(n['tags'])}]" if n.get("tags") else ""
+            lines.append(f"#{n['id']} • {t} • by <@{n['author_id']}>{tag}\n{n['note']}")
+        return f"Notes for {self.member} — page {page}/{pages}\n\n" + "\n\n".join(lines)
+
+    async def _turn(self, interaction: Interaction, **cursor):
+        self._show(self.store.member_page(self.guild_id, self.member.id, limit=NOTES_PER_PAGE, **cursor))
+        await interaction.response.edit_message(content=self.render(), view=self if self.rows else None)
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.secondary)
+    async def prev_page(self, interaction: Interaction, _: discord.ui.Button):
+        await self._turn(interaction, before=self.rows[0]["id"] if self.rows else None)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: Interaction, _: discord.ui.Button):
+        await self._turn(interaction, after=self.rows[-1]["id"] if self.rows else None)
+
+    async def interaction_check(self, interaction: Interaction) -> bool:
+        if interaction.user.id != self.actor_id:
+            await interaction.response.send_message("You cannot use this menu.", ephemeral=True)
+            return False
+        return True
+
+
 class ModNotes(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self._lock = asyncio.Lock()
-        self._data: dict[str, Any] = {}
-        self._load()
-
-    def _load(self):
-        if NOTES_PATH.exists():
-            try:
-                self._data = json.loads(NOTES_PATH.read_text(encoding="utf-8"))
-            except Exception:
-                self._data = {}
-        if "guilds" not in self._data: self._data = {"guilds": {}}
-
-    async def _save(self):
-        tmp = NOTES_PATH.with_suffix(".tmp")
-        txt = json.dumps(self._data, ensure_ascii=False, indent=2)
-        await asyncio.to_thread(tmp.write_text, txt, "utf-8")
-        await asyncio.to_thread(tmp.replace, NOTES_PATH)
-
-    def _g(self, gid: int) -> dict:
-        key = str(gid)
-        g = self._data["guilds"].get(key)
-        if not g:
-            g = {"_seq": 1, "notes": []}
-            self._data["guilds"][key] = g
-        return g
-
-    def _next_id(self, gid: int) -> int:
-        g = self._g(gid); nid = int(g["_seq"]); g["_seq"] = nid + 1; return nid
+        self.notes = open_store()
 
     notes_group = app_commands.Group(name="note", description="Moderation notes")
 
@@ -48,77 +70,48 @@ class ModNotes(commands.Cog):
     @app_commands.checks.has_permissions(manage_messages=True)
     async def add(self, interaction: Interaction, member: discord.Member, note: str, tags: str | None = None):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        async with self._lock:
-            gid = interaction.guild_id
-            entry = {
-                "id": self._next_id(gid),
-                "user_id": str(member.id),
-                "author_id": str(interaction.user.id),
-                "ts": _now(),
-                "note": note,
-                "tags": [t.strip() for t in tags.split(",")] if tags else []
-            }
-            self._g(gid)["notes"].append(entry)
-            await self._save()
+        entry = await self.notes.add(
+            interaction.guild_id,
+            user_id=member.id,
+            author_id=interaction.user.id,
+            ts=_now(),
+            note=note,
+            tags=[t.strip() for t in tags.split(",")] if tags else [],
+        )
         await interaction.followup.send(f"Added note #{entry['id']} for {member}.")
 
     @notes_group.command(name="list", description="List notes for a member")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def list_notes(self, interaction: Interaction, member: discord.Member, page: app_commands.Range[int,1,1000]=1):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        g = self._g(interaction.guild_id)
-        rows = [n for n in g["notes"] if n["user_id"] == str(member.id)]
-        rows.sort(key=lambda x: x["id"])
-        per = 10
-        pages = max(1, math.ceil(len(rows)/per))
-        page = min(max(1, page), pages)
-        start = (page-1)*per; chunk = rows[start:start+per]
-        if not chunk:
+        first = self.notes.member_page(interaction.guild_id, member.id,
+                                       start=(page-1)*NOTES_PER_PAGE, limit=NOTES_PER_PAGE)
+        if not first[0]:
             await interaction.followup.send("No notes found."); return
-        lines = []
-        for n in chunk:
-            t = n["ts"].replace("T"," ").split(".")[0]
-            tag = f" [{', '.join(n['tags'])}]" if n.get("tags") else ""
-            lines.append(f"#{n['id']} • {t} • by <@{n['author_id']}>{tag}\n{n['note']}")
-        await interaction.followup.send(f"Notes for {member} — page {page}/{pages}\n\n" + "\n\n".join(lines))
+        view = NotePageView(self.notes, interaction.user, interaction.guild_id, member, first)
+        await interaction.followup.send(view.render(), view=view)
 
     @notes_group.command(name="remove", description="Remove a note by id")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def remove(self, interaction: Interaction, id: int):
         await interaction.response.defer(ephemeral=True)
-        async with self._lock:
-            g = self._g(interaction.guild_id)
-            before = len(g["notes"])
-            g["notes"] = [n for n in g["notes"] if int(n["id"]) != id]
-            changed = len(g["notes"]) != before
-            if changed: await self._save()
-        await interaction.followup.send("Removed." if changed else "Not found.")
+        removed = await self.notes.remove(interaction.guild_id, id)
+        await interaction.followup.send("Removed." if removed else "Not found.")
 
     @notes_group.command(name="edit", description="Edit a note by id")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def edit(self, interaction: Interaction, id: int, note: str):
         await interaction.response.defer(ephemeral=True)
-        async with self._lock:
-            g = self._g(interaction.guild_id)
-            target = next((n for n in g["notes"] if int(n["id"]) == id), None)
-            if not target:
-                await interaction.followup.send("Not found."); return
-            target["note"] = note
-            target["edited_ts"] = _now()
-            await self._save()
-        await interaction.followup.send("Updated.")
+        target = await self.notes.edit(interaction.guild_id, id, note=note, ts=_now())
+        await interaction.followup.send("Updated." if target else "Not found.")
 
     @notes_group.command(name="search", description="Search notes")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def search(self, interaction: Interaction, query: str, member: discord.Member | None = None, author: discord.Member | None = None):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        g = self._g(interaction.guild_id)
-        q = query.lower()
-        rows = [n for n in g["notes"] if q in n["note"].lower() or any(q in t.lower() for t in n.get("tags", []))]
-        if member: rows = [n for n in rows if n["user_id"] == str(member.id)]
-        if author: rows = [n for n in rows if n["author_id"] == str(author.id)]
-        rows.sort(key=lambda x: x["id"])
-        rows = rows[:15]
+        rows = self.notes.search(interaction.guild_id, query,
+                                 user_id=member.id if member else None,
+                                 author_id=author.id if author else None)
         if not rows:
             await interaction.followup.send("No matches."); return
         out = []
@@ -131,8 +124,8 @@ class ModNotes(commands.Cog):
     @app_commands.checks.has_permissions(manage_messages=True)
     async def export(self, interaction: Interaction, member: discord.Member | None = None):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        g = self._g(interaction.guild_id)
-        rows = g["notes"] if member is None else [n for n in g["notes"] if n["user_id"] == str(member.id)]
+        rows = self.notes.notes(interaction.guild_id)
+        if member is not None: rows = [n for n in rows if n["user_id"] == str(member.id)]
         b = io.BytesIO(json.dumps(rows, ensure_ascii=False, indent=2).encode("utf-8"))
         await interaction.followup.send(file=File(b, filename=f"notes_{interaction.guild_id}.json"))
 
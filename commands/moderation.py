@@ -10,24 +10,26 @@ import os, json, io, asyncio, math
 from pathlib import Path
 from typing import Any
 import aiohttp
-import pandas as pd
-import psutil
 import discord
 from discord import app_commands, Interaction, Attachment, File
 from discord.ext import commands
+from utils.note_store import open_store
+from utils.ban_executor import BanExecutor
+from utils.csv_sink import CsvSink
+from utils.name_index import NameIndex
+from commands.mod_notes import NotePageView, NOTES_PER_PAGE
 from dotenv import load_dotenv
 
 load_dotenv()
 TRACE_LOG_CHANNEL_ID = int(os.getenv("BLACKBIRDLOGS_ID", "0"))
+# seconds between progress edits during a mass ban
+PROGRESS_EVERY = 3
 
 def progress_bar(current: int, total: int, width: int = 30) -> str:
     filled = int(width * current / total) if total else 0
     return "[" + ("#" * filled) + ("-" * (width - filled)) + "]"
 
 
-NOTES_PATH = Path(os.getenv("NOTES_JSON_PATH") or Path(__file__).resolve().parents[1] / "data" / "mod_notes.json")
-NOTES_PATH.parent.mkdir(parents=True, exist_ok=True)
-
 def _now(): return discord.utils.utcnow().isoformat()
 
 class Moderation(commands.Cog):
@@ -35,9 +37,7 @@ class Moderation(commands.Cog):
         self.bot = bot
         self.start_time = time.time()
         self.bot = bot
-        self._lock = asyncio.Lock()
-        self._data: dict[str, Any] = {}
-        self._load()
+        self.notes = open_store()
 
 
     def normalize_ban_entries(payload):
@@ -132,90 +132,98 @@ class Moderation(commands.Cog):
             except Exception:
                 pass
 
-            name_map = {}
-            for m in guild.members:
-                for k in (m.name, m.display_name, m.global_name or ""):
-                    if k:
-                        name_map.setdefault(k.lower(), m)
+            names: NameIndex | None = None
+
+            def by_name(entry) -> tuple[int | None, str]:
+                """(member id, "") for a username only one member matches, else (None, why not)."""
+                nonlocal names
+                uname = (entry.get("username") or "").strip()
+                if not uname:
+                    return None, "no id or username"
+                if names is None:
+                    names = NameIndex.from_members(guild.members)
+                ids = names.lookup(uname)
+                if len(ids) == 1:
+                    return next(iter(ids)), ""
+                if not ids:
+                    return None, "no member matches the username"
+                return None, f"username is ambiguous ({len(ids)} members match)"
 
             total = len(ban_entries)
-            banned = failed = skipped_dup = 0
-            update_every = max(1, total // 25) if total else 1
-            seen_ids: set[int] = set()
+            last_edit = 0.0
+
+            async def progress(done: int, pending: int):
+                nonlocal last_edit
+                now = time.monotonic()
+                if now - last_edit < PROGRESS_EVERY and done < pending:
+                    return
+                last_edit = now
+                try:
+                    await message.edit(content=f"{progress_bar(done, pending)}\nBanned or tried: {done}/{pending}")
+                except discord.HTTPException:
+                    pass
 
-            for index, entry in enumerate(ban_entries, start=1):
-                user_obj = None
+            # resolve every entry to a user id first, then ban them all in one go
+            targets: dict[int, str] = {}
+            rows = []  # [entry, target id, outcome, note]; outcome "" until the bans are done
+            for entry in ban_entries:
                 reason = (entry.get("reason") or "No reason provided")[:512]
                 raw_id = entry.get("id")
-
-                target_id: int | None = None
                 if raw_id and str(raw_id).isdigit():
-                    target_id = int(raw_id)
-
-                if target_id:
-                    if target_id in seen_ids:
-                        skipped_dup += 1
-                    else:
-                        try:
-                            await guild.ban(discord.Object(id=target_id), reason=reason)
-                            seen_ids.add(target_id)
-                            banned += 1
-                        except Exception as e:
-                            # fallback search if we also have a username
-                            uname = (entry.get("username") or "").strip().lower()
-                            if uname:
-                                user_obj = name_map.get(uname)
-                                if user_obj is None:
-                                    candidates = [m for k, m in name_map.items() if uname in k]
-                                    if len(candidates) == 1:
-                                        user_obj = candidates[0]
-                            if user_obj:
-                                try:
-                                    await guild.ban(user_obj, reason=reason)
-                                    seen_ids.add(int(user_obj.id))
-                                    banned += 1
-                                except Exception as ee:
-                                    failed += 1
-                                    print(f"Failed to ban {target_id} via fallback: {ee}")
-                            else:
-                                failed += 1
-                                print(f"Failed to ban {target_id}: {e}")
+                    tid, note = int(raw_id), ""
+                else:
+                    tid, note = by_name(entry)
+                if tid is None:
+                    rows.append([entry, None, "unresolved", note])
+                elif tid in targets:
+                    rows.append([entry, tid, "duplicate", ""])
                 else:
-                    # No ID = try username-only fallback
-                    uname = (entry.get("username") or "").strip().lower()
-                    if not uname:
-                        failed += 1
+                    targets[tid] = reason
+                    rows.append([entry, tid, "", ""])
+
+            executor = BanExecutor(guild, on_progress=progress)
+            results = await executor.run(targets)
+
+            # an id that failed gets one more try through the entry's username
+            retry: dict[int, str] = {}
+            for row in rows:
+                entry, tid, outcome, _ = row
+                if outcome or results.get(tid) is None or not entry.get("id"):
+                    continue
+                alt, note = by_name(entry)
+                if alt is not None and alt != tid and alt not in targets and alt not in retry:
+                    retry[alt] = targets[tid]
+                    row[1:3] = [alt, "fallback"]
+                elif entry.get("username"):
+                    row[3] = f"fallback skipped: {note or 'matched member already handled'}"
+            if retry:
+                results = await executor.run(retry)
+
+            sink = CsvSink(["entry", "id", "username", "reason", "target_id", "result", "error"],
+                           f"massshadow_{guild.id}_{int(time.time())}.csv")
+            counts = {"banned": 0, "failed": 0, "duplicate": 0, "unresolved": 0}
+            with sink:
+                for n, (entry, tid, outcome, note) in enumerate(rows, start=1):
+                    err = results.get(tid) if outcome in ("", "fallback") else None
+                    if outcome in ("", "fallback"):
+                        result = "failed" if err else "banned"
                     else:
-                        user_obj = name_map.get(uname)
-                        if user_obj is None:
-                            candidates = [m for k, m in name_map.items() if uname in k]
-                            if len(candidates) == 1:
-                                user_obj = candidates[0]
-                        if user_obj:
-                            tid = int(user_obj.id)
-                            if tid in seen_ids:
-                                skipped_dup += 1
-                            else:
-                                try:
-                                    await guild.ban(user_obj, reason=reason)
-                                    seen_ids.add(tid)
-                                    banned += 1
-                                except Exception as e:
-                                    failed += 1
-                                    print(f"Failed to ban {tid}: {e}")
-                        else:
-                            failed += 1
-
-                if index % update_every == 0 or index == total:
-                    bar = progress_bar(index, total)
-                    await message.edit(content=f"{bar}\nProgress: {index}/{total}")
-
-            await message.edit(
-                content=(
+                        result = outcome
+                    counts[result] += 1
+                    if outcome == "fallback" and not err:
+                        result = "banned by username"
+                    err = "; ".join(x for x in (err, note) if x)
+                    sink.writerow([n, entry.get("id") or "", entry.get("username") or "", entry.get("reason") or "",
+                                   tid or "", result, err])
+
+                summary = (
                     "Mass Shadow Generator complete.\n"
-                    f"Banned: {banned}\nFailed: {failed}\nSkipped (duplicate): {skipped_dup}"
+                    f"Banned: {counts['banned']}\nFailed: {counts['failed']}\n"
+                    f"Unresolved (no match or ambiguous name): {counts['unresolved']}\n"
+                    f"Skipped (duplicate): {counts['duplicate']}"
                 )
-            )
+                await message.edit(content=f"{progress_bar(total, total)}\n{summary}")
+                await sink.send(interaction.followup.send, "Per-entry results:", limit=guild.filesize_limit)
         except Exception as e:
             await message.edit(content=f"Error: {e}")
     @app_commands.command(name="parse_zip", description="Parse a zip of .txt files into a banlist JSON and Excel.")
@@ -255,6 +263,7 @@ class Moderation(commands.Cog):
             json_bytes = io.BytesIO(json.dumps(banlist, indent=4).encode())
             json_bytes.seek(0)
             excel_buffer = io.BytesIO()
+            import pandas as pd
             pd.DataFrame(banlist).to_excel(excel_buffer, index=False)
             excel_buffer.seek(0)
 
@@ -271,6 +280,7 @@ class Moderation(commands.Cog):
         uptime_seconds = int(now - self.start_time)
         uptime_str = str(timedelta(seconds=uptime_seconds))
 
+        import psutil
         process = psutil.Process()
         mem = process.memory_info().rss / 1024 / 1024
         system = platform.system()
@@ -388,108 +398,54 @@ class Moderation(commands.Cog):
                 await asyncio.sleep(delay_ms / 1000)
 
         await interaction.followup.send(f"Moved {moved} member(s). Failed: {failed}", ephemeral=True)
-    def _load(self):
-        if NOTES_PATH.exists():
-            try:
-                self._data = json.loads(NOTES_PATH.read_text(encoding="utf-8"))
-            except Exception:
-                self._data = {}
-        if "guilds" not in self._data: self._data = {"guilds": {}}
-
-    async def _save(self):
-        tmp = NOTES_PATH.with_suffix(".tmp")
-        txt = json.dumps(self._data, ensure_ascii=False, indent=2)
-        await asyncio.to_thread(tmp.write_text, txt, "utf-8")
-        await asyncio.to_thread(tmp.replace, NOTES_PATH)
-
-    def _g(self, gid: int) -> dict:
-        key = str(gid)
-        g = self._data["guilds"].get(key)
-        if not g:
-            g = {"_seq": 1, "notes": []}
-            self._data["guilds"][key] = g
-        return g
-
-    def _next_id(self, gid: int) -> int:
-        g = self._g(gid); nid = int(g["_seq"]); g["_seq"] = nid + 1; return nid
-
     notes_group = app_commands.Group(name="note", description="Moderation notes")
 
     @notes_group.command(name="add", description="Add a note")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def add(self, interaction: Interaction, member: discord.Member, note: str, tags: str | None = None):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        async with self._lock:
-            gid = interaction.guild_id
-            entry = {
-                "id": self._next_id(gid),
-                "user_id": str(member.id),
-                "author_id": str(interaction.user.id),
-                "ts": _now(),
-                "note": note,
-                "tags": [t.strip() for t in tags.split(",")] if tags else []
-            }
-            self._g(gid)["notes"].append(entry)
-            await self._save()
+        entry = await self.notes.add(
+            interaction.guild_id,
+            user_id=member.id,
+            author_id=interaction.user.id,
+            ts=_now(),
+            note=note,
+            tags=[t.strip() for t in tags.split(",")] if tags else [],
+        )
         await interaction.followup.send(f"Added note #{entry['id']} for {member}.")
 
     @notes_group.command(name="list", description="List notes for a member")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def list_notes(self, interaction: Interaction, member: discord.Member, page: app_commands.Range[int,1,1000]=1):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        g = self._g(interaction.guild_id)
-        rows = [n for n in g["notes"] if n["user_id"] == str(member.id)]
-        rows.sort(key=lambda x: x["id"])
-        per = 10
-        pages = max(1, math.ceil(len(rows)/per))
-        page = min(max(1, page), pages)
-        start = (page-1)*per; chunk = rows[start:start+per]
-        if not chunk:
+        first = self.notes.member_page(interaction.guild_id, member.id,
+                                       start=(page-1)*NOTES_PER_PAGE, limit=NOTES_PER_PAGE)
+        if not first[0]:
             await interaction.followup.send("No notes found."); return
-        lines = []
-        for n in chunk:
-            t = n["ts"].replace("T"," ").split(".")[0]
-            tag = f" [{', '.join(n['tags'])}]" if n.get("tags") else ""
-            lines.append(f"#{n['id']} • {t} • by <@{n['author_id']}>{tag}\n{n['note']}")
-        await interaction.followup.send(f"Notes for {member} — page {page}/{pages}\n\n" + "\n\n".join(lines))
+        view = NotePageView(self.notes, interaction.user, interaction.guild_id, member, first)
+        await interaction.followup.send(view.render(), view=view)
 
     @notes_group.command(name="remove", description="Remove a note by id")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def remove(self, interaction: Interaction, id: int):
         await interaction.response.defer(ephemeral=True)
-        async with self._lock:
-            g = self._g(interaction.guild_id)
-            before = len(g["notes"])
-            g["notes"] = [n for n in g["notes"] if int(n["id"]) != id]
-            changed = len(g["notes"]) != before
-            if changed: await self._save()
-        await interaction.followup.send("Removed." if changed else "Not found.")
+        removed = await self.notes.remove(interaction.guild_id, id)
+        await interaction.followup.send("Removed." if removed else "Not found.")
 
     @notes_group.command(name="edit", description="Edit a note by id")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def edit(self, interaction: Interaction, id: int, note: str):
         await interaction.response.defer(ephemeral=True)
-        async with self._lock:
-            g = self._g(interaction.guild_id)
-            target = next((n for n in g["notes"] if int(n["id"]) == id), None)
-            if not target:
-                await interaction.followup.send("Not found."); return
-            target["note"] = note
-            target["edited_ts"] = _now()
-            await self._save()
-        await interaction.followup.send("Updated.")
+        target = await self.notes.edit(interaction.guild_id, id, note=note, ts=_now())
+        await interaction.followup.send("Updated." if target else "Not found.")
 
     @notes_group.command(name="search", description="Search notes")
     @app_commands.checks.has_permissions(manage_messages=True)
     async def search(self, interaction: Interaction, query: str, member: discord.Member | None = None, author: discord.Member | None = None):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        g = self._g(interaction.guild_id)
-        q = query.lower()
-        rows = [n for n in g["notes"] if q in n["note"].lower() or any(q in t.lower() for t in n.get("tags", []))]
-        if member: rows = [n for n in rows if n["user_id"] == str(member.id)]
-        if author: rows = [n for n in rows if n["author_id"] == str(author.id)]
-        rows.sort(key=lambda x: x["id"])
-        rows = rows[:15]
+        rows = self.notes.search(interaction.guild_id, query,
+                                 user_id=member.id if member else None,
+                                 author_id=author.id if author else None)
         if not rows:
             await interaction.followup.send("No matches."); return
         out = []
@@ -502,8 +458,8 @@ class Moderation(commands.Cog):
     @app_commands.checks.has_permissions(manage_messages=True)
     async def export(self, interaction: Interaction, member: discord.Member | None = None):
         await interaction.response.defer(ephemeral=True, thinking=True)
-        g = self._g(interaction.guild_id)
-        rows = g["notes"] if member is None else [n for n in g["notes"] if n["user_id"] == str(member.id)]
+        rows = self.notes.notes(interaction.guild_id)
+        if member is not None: rows = [n for n in rows if n["user_id"] == str(member.id)]
         b = io.BytesIO(json.dumps(rows, ensure_ascii=False, indent=2).encode("utf-8"))
         await interaction.followup.send(file=File(b, filename=f"notes_{interaction.guild_id}.json"))
 
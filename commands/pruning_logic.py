@@ -1,52 +1,131 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 import asyncio
-import json
+import heapq
 import os
-import csv
-import random
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Literal
+from utils.persist import JsonWriter, read_json
+from utils.csv_sink import CsvSink
+from utils.delete_pipeline import DeletePipeline
 
 
+# {"channels": {"<channel id>": {"interval", "unit", "log_channel_id", "images_only"}}}
 CONFIG_FILE = "prune_schedule.json"
-LAST_FILE = "last_prune.txt"
+LAST_FILE = "last_prune.txt"  # pre multi-channel, read once to migrate
+# per channel: when its last scheduled prune started
+LAST_RUNS_FILE = "prune_last_runs.json"
+# per channel: every message id at or below this has already been through a prune
+CURSOR_FILE = "prune_cursors.json"
 
 DEBUG_MODE = os.getenv("PRUNE_DEBUG") == "1"
-LOOP_INTERVAL = 60 if DEBUG_MODE else 1800
+# the scheduler sleeps until the next due prune, but wakes at least this often to stat the config file
+CONFIG_CHECK_SECONDS = 60 if DEBUG_MODE else 300
+PRUNE_CONCURRENCY = int(os.getenv("PRUNE_CONCURRENCY", "2"))
 UNIT_SECONDS: dict[str, int] = {"minutes": 60, "hours": 3600, "days": 86400}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp", ".heic", ".tiff")
+
+
+def is_image(att: discord.Attachment) -> bool:
+    if att.content_type:
+        return att.content_type.startswith("image/")
+    return att.filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _fmt(ts: float) -> str:
+    dt = datetime.fromtimestamp(ts, timezone.utc)
+    return f"{discord.utils.format_dt(dt, style='F')} ({discord.utils.format_dt(dt, style='R')})"
+
 
 class Pruning(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        self.auto_prune_loop.start()
+        self._config_writer = JsonWriter(CONFIG_FILE)
+        self._config_mtime: float | None = None
+        self.schedules: dict[int, dict] = {}
+        self._last: dict[str, float] = read_json(LAST_RUNS_FILE, {})
+        self._last_writer = JsonWriter(LAST_RUNS_FILE)
+        self._cursors: dict[str, int] = read_json(CURSOR_FILE, {})
+        self._cursor_writer = JsonWriter(CURSOR_FILE)
+        # (due, channel id); an entry is live only while it matches self._due
+        self._heap: list[tuple[float, int]] = []
+        self._due: dict[int, float] = {}
+        self._wake = asyncio.Event()
+        self._running: dict[int, asyncio.Task] = {}
+        self._channel_locks: dict[int, asyncio.Lock] = {}
+        self._slots = asyncio.Semaphore(PRUNE_CONCURRENCY)
+        self._scheduler: asyncio.Task | None = None
+
+    async def cog_load(self):
+        self._scheduler = asyncio.create_task(self._run_scheduler())
 
-    def cog_unload(self):
-        self.auto_prune_loop.cancel()
+    async def cog_unload(self):
+        for task in (self._scheduler, *self._running.values()):
+            if task:
+                task.cancel()
+        await self._config_writer.flush()
+        await self._last_writer.flush()
+        await self._cursor_writer.flush()
+
+    # config
 
     def load_config(self) -> dict:
-        if not os.path.exists(CONFIG_FILE):
-            return {}
-        try:
-            with open(CONFIG_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            return {}
+        pending = self._config_writer.pending
+        if pending is not None:
+            return pending
+        config = read_json(CONFIG_FILE, {})
+        if "channel_id" in config:
+            # single-channel layout from before schedules were per channel
+            cid = str(config["channel_id"])
+            config = {"channels": {cid: {"interval": config.get("interval"), "unit": config.get("unit"),
+                                         "log_channel_id": config.get("log_channel_id"), "images_only": False}}}
+            if cid not in self._last and os.path.exists(LAST_FILE):
+                with open(LAST_FILE, "r") as f:
+                    self._last[cid] = float(f.read().strip() or 0)
+                self._last_writer.save(self._last)
+            self.save_config(config)
+        config.setdefault("channels", {})
+        return config
 
     def save_config(self, config):
-        with open(CONFIG_FILE, "w") as f:
-            json.dump(config, f)
+        self._config_writer.save(config)
 
-    def load_last(self):
-        if os.path.exists(LAST_FILE):
-            with open(LAST_FILE, "r") as f:
-                return float(f.read().strip() or 0)
-        return 0
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(CONFIG_FILE).st_mtime
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._config_mtime or self._config_writer.dirty:
+            return  # unchanged, or our own pending save is newer than the file
+        self._config_mtime = mtime
+        self.schedules = {int(cid): sched for cid, sched in self.load_config()["channels"].items()}
+        for cid in set(self._due) - set(self.schedules):
+            self._due.pop(cid)
+        for cid in self.schedules:
+            self._reschedule(cid)
+
+    def _store_schedules(self):
+        self.save_config({"channels": {str(cid): sched for cid, sched in self.schedules.items()}})
+        self._wake.set()
 
-    def save_last(self, ts: float):
-        with open(LAST_FILE, "w") as f:
-            f.write(str(ts))
+    def advance_cursor(self, channel_id: int, message_id: int, images_only: bool = False):
+        # a full prune covers images too, an images-only one covers nothing else
+        keys = [f"{channel_id}:images"] if images_only else [str(channel_id), f"{channel_id}:images"]
+        changed = False
+        for key in keys:
+            if message_id > self._cursors.get(key, 0):
+                self._cursors[key] = message_id
+                changed = True
+        if changed:
+            self._cursor_writer.save(self._cursors)
+
+    def cursor(self, channel_id: int, images_only: bool = False) -> int | None:
+        full = self._cursors.get(str(channel_id))
+        if not images_only:
+            return full
+        return max(full or 0, self._cursors.get(f"{channel_id}:images", 0)) or None
 
     def interval_seconds(self, config: dict) -> int | None:
         try:
@@ -61,6 +140,80 @@ class Pruning(commands.Cog):
             return None
         return interval * multiplier
 
+    # scheduling
+
+    def next_timestamp(self, channel_id: int) -> float | None:
+        interval_sec = self.interval_seconds(self.schedules.get(channel_id, {}))
+        if not interval_sec:
+            return None
+        return self._last.get(str(channel_id), 0) + interval_sec
+
+    def _reschedule(self, channel_id: int):
+        due = self.next_timestamp(channel_id)
+        if due is None or channel_id in self._running:
+            self._due.pop(channel_id, None)
+            return
+        if self._due.get(channel_id) != due:
+            self._due[channel_id] = due
+            heapq.heappush(self._heap, (due, channel_id))
+            self._wake.set()
+
+    async def _run_scheduler(self):
+        await self.bot.wait_until_ready()
+        while True:
+            try:
+                self._reload_if_changed()
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    due, cid = heapq.heappop(self._heap)
+                    if self._due.get(cid) != due:
+                        continue  # superseded by a reschedule or removal
+                    del self._due[cid]
+                    self._start(cid)
+                timeout = CONFIG_CHECK_SECONDS
+                if self._heap:
+                    timeout = min(timeout, max(0.0, self._heap[0][0] - now))
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"prune scheduler error: {e}")
+                await asyncio.sleep(5)
+
+    def _start(self, channel_id: int):
+        task = asyncio.create_task(self._scheduled_prune(channel_id))
+        self._running[channel_id] = task
+
+    async def _scheduled_prune(self, channel_id: int):
+        try:
+            async with self._slots:
+                await self.run_schedule(channel_id)
+        except Exception as e:
+            print(f"scheduled prune of {channel_id} failed: {e}")
+        finally:
+            self._running.pop(channel_id, None)
+            self._reschedule(channel_id)
+
+    async def run_schedule(self, channel_id: int, extra_channel: discord.TextChannel | None = None) -> int | None:
+        """Prune one configured channel now and restart its interval; None if it can't run."""
+        sched = self.schedules.get(channel_id)
+        interval_sec = self.interval_seconds(sched or {})
+        if not interval_sec:
+            return None
+        channel = await self.resolve_text_channel(channel_id)
+        if not channel:
+            return None
+        log_channel = await self.resolve_text_channel(sched.get("log_channel_id"))
+        self._last[str(channel_id)] = time.time()
+        self._last_writer.save(self._last)
+        cutoff = datetime.utcnow() - timedelta(seconds=interval_sec)
+        return await self.prune_channel(channel, cutoff, log_channel, extra_channel,
+                                        images_only=bool(sched.get("images_only")))
+
     async def resolve_text_channel(self, channel_id: int | None) -> discord.TextChannel | None:
         if not channel_id:
             return None
@@ -73,152 +226,114 @@ class Pruning(commands.Cog):
             return None
         return fetched if isinstance(fetched, discord.TextChannel) else None
 
-    def next_timestamp(self, last_ts: float, interval_sec: int) -> float:
-        if last_ts > 0:
-            return last_ts + interval_sec
-        return datetime.utcnow().timestamp() + interval_sec
-
-    async def safe_delete(self, msg: discord.Message):
-        try:
-            await msg.delete()
-            await asyncio.sleep(0.12)
-            return True
-        except discord.NotFound:
-            return False
-        except discord.HTTPException as e:
-            retry_after = getattr(e, "retry_after", None)
-            if retry_after:
-                await asyncio.sleep(retry_after + 0.25)
-                try:
-                    await msg.delete()
-                    return True
-                except Exception:
-                    return False
-            return False
-
     async def prune_channel(
         self,
         channel: discord.TextChannel,
         cutoff: datetime,
         log_channel: discord.TextChannel | None,
         extra_channel: discord.TextChannel | None = None,
+        full_scan: bool = False,
+        images_only: bool = False,
     ) -> int:
-        deleted = []
-        bulk_candidates = []
-        single_candidates = []
-
-        async for msg in channel.history(limit=None, before=cutoff):
-            if msg.attachments:
-                for att in msg.attachments:
-                    deleted.append([msg.id, msg.author.id, msg.created_at.isoformat(), att.url, channel.id])
-                age = datetime.now(timezone.utc) - msg.created_at
-                if age.days < 14:
-                    bulk_candidates.append(msg)
-                else:
-                    single_candidates.append(msg)
+        lock = self._channel_locks.setdefault(channel.id, asyncio.Lock())
+        async with lock:
+            return await self._prune_channel(channel, cutoff, log_channel, extra_channel, full_scan, images_only)
 
-        for i in range(0, len(bulk_candidates), 100):
-            chunk = bulk_candidates[i:i+100]
-            try:
-                await channel.delete_messages(chunk)
-            except Exception:
-                for m in chunk:
-                    await self.safe_delete(m)
-            await asyncio.sleep(0.5)
-
-        for m in single_candidates:
-            await self.safe_delete(m)
-
-        if deleted:
-            fn = f"prune_log_{int(datetime.utcnow().timestamp())}.csv"
-            with open(fn, "w", newline="") as f:
-                writer = csv.writer(f)
-                writer.writerow(["id","author","created","url","channel"])
-                writer.writerows(deleted)
-            if log_channel:
-                await log_channel.send(file=discord.File(fn))
-            if extra_channel:
-                await extra_channel.send(content=f"Deleted {len(deleted)} messages with attachments in {channel.mention}", file=discord.File(fn))
-            os.remove(fn)
-        elif extra_channel:
-            await extra_channel.send(content=f"No messages with attachments found to prune in {channel.mention}")
-        return len(deleted)
-
-    @tasks.loop(seconds=LOOP_INTERVAL)
-    async def auto_prune_loop(self):
-        try:
-            print(f"auto_prune_loop tick (interval={LOOP_INTERVAL}s, debug={DEBUG_MODE})")
-            await asyncio.sleep(random.uniform(0,5))
-            config = self.load_config()
-            if not config or "channel_id" not in config:
-                return
-            interval_sec = self.interval_seconds(config)
-            if not interval_sec:
-                return
-            last_ts = self.load_last()
-            now_ts = datetime.utcnow().timestamp()
-            if now_ts - last_ts < interval_sec:
-                return
-            channel = await self.resolve_text_channel(config.get("channel_id"))
-            log_channel = await self.resolve_text_channel(config.get("log_channel_id"))
-            if not channel:
-                return
-            cutoff = datetime.utcnow() - timedelta(seconds=interval_sec)
-            await self.prune_channel(channel, cutoff, log_channel)
-            self.save_last(now_ts)
-        except Exception as e:
-            print(f"auto_prune_loop error: {e}")
+    async def _prune_channel(self, channel, cutoff, log_channel, extra_channel, full_scan, images_only) -> int:
+        sink = CsvSink(["id","author","created","url","channel"], f"prune_log_{int(datetime.utcnow().timestamp())}.csv")
+        kind = "images" if images_only else "attachments"
 
-    @auto_prune_loop.before_loop
-    async def before_auto_prune_loop(self):
-        await self.bot.wait_until_ready()
+        # only read what arrived since the last prune, oldest first
+        boundary = discord.utils.time_snowflake(cutoff, high=False)  # history(before=cutoff) stops below this id
+        cursor = None if full_scan else self.cursor(channel.id, images_only)
+        after = discord.Object(id=cursor) if cursor else None
+        reached = boundary - 1
+        read_error: Exception | None = None
+        with sink:
+            if not cursor or cursor < boundary - 1:
+                # deletes run while history is still being read
+                async with DeletePipeline(channel) as pipeline:
+                    try:
+                        async for msg in channel.history(limit=None, before=cutoff, after=after, oldest_first=True):
+                            if not msg.attachments:
+                                continue
+                            if images_only and not any(is_image(att) for att in msg.attachments):
+                                continue
+                            sink.writerows([msg.id, msg.author.id, msg.created_at.isoformat(), att.url, channel.id]
+                                           for att in msg.attachments)
+                            await pipeline.submit(msg)
+                    except Exception as e:
+                        # what was already queued is still deleted, so it has to reach the log below
+                        read_error = e
+                if pipeline.failed:
+                    print(f"prune: {pipeline.failed} message(s) in {channel.id} could not be deleted")
+                    # stop the cursor short of them so the next prune tries again
+                    reached = pipeline.oldest_failed - 1
+            if read_error is None:
+                self.advance_cursor(channel.id, reached, images_only)
+
+            if sink.rows:
+                if log_channel:
+                    note = f"Prune of {channel.mention} stopped early: {read_error}" if read_error else None
+                    await sink.send(log_channel.send, note, limit=log_channel.guild.filesize_limit)
+                if extra_channel:
+                    await sink.send(extra_channel.send, f"Deleted {sink.rows} messages with {kind} in {channel.mention}",
+                                    limit=extra_channel.guild.filesize_limit)
+            elif extra_channel and read_error is None:
+                await extra_channel.send(content=f"No messages with {kind} found to prune in {channel.mention}")
+        if read_error is not None:
+            raise read_error
+        return sink.rows
+
+    # commands
 
     @app_commands.command(name="prune_attachments", description="Manually prune attachments")
-    async def prune_attachments(self, interaction: discord.Interaction, days: int, channel: discord.TextChannel, images_only: bool = False):
+    @app_commands.describe(full_scan="Re-read the whole channel instead of only what arrived since the last prune")
+    async def prune_attachments(self, interaction: discord.Interaction, days: int, channel: discord.TextChannel,
+                                images_only: bool = False, full_scan: bool = False):
         await interaction.response.defer(ephemeral=True)
         cutoff = datetime.utcnow() - timedelta(days=days)
-        log_channel = await self.resolve_text_channel(self.load_config().get("log_channel_id"))
-        await self.prune_channel(channel, cutoff, log_channel, interaction.channel)
+        sched = self.schedules.get(channel.id) or next(iter(self.schedules.values()), {})
+        log_channel = await self.resolve_text_channel(sched.get("log_channel_id"))
+        await self.prune_channel(channel, cutoff, log_channel, interaction.channel,
+                                 full_scan=full_scan, images_only=images_only)
         await interaction.followup.send(f"Manual prune executed for {channel.mention}", ephemeral=True)
 
-    @app_commands.command(name="prune", description="Run the configured prune if the schedule allows it")
-    async def prune(self, interaction: discord.Interaction):
+    def _targets(self, channel: discord.TextChannel | None) -> list[int]:
+        self._reload_if_changed()
+        if channel is not None:
+            return [channel.id] if channel.id in self.schedules else []
+        return list(self.schedules)
+
+    @app_commands.command(name="prune", description="Run the configured prunes that are due")
+    @app_commands.describe(channel="Only this configured channel (default: every configured channel)")
+    async def prune(self, interaction: discord.Interaction, channel: discord.TextChannel | None = None):
         await interaction.response.defer(ephemeral=True)
-        config = self.load_config()
-        if not config or "channel_id" not in config:
+        targets = self._targets(channel)
+        if not targets:
             await interaction.followup.send("No prune config set", ephemeral=True)
             return
-        interval_sec = self.interval_seconds(config)
-        if not interval_sec:
-            await interaction.followup.send("Invalid prune config. Please run /set_prune_config again.", ephemeral=True)
-            return
-        now_ts = datetime.utcnow().timestamp()
-        last_ts = self.load_last()
-        if last_ts and now_ts - last_ts < interval_sec:
-            next_ts = self.next_timestamp(last_ts, interval_sec)
-            next_dt = datetime.utcfromtimestamp(next_ts)
-            await interaction.followup.send(
-                f"Too early to prune. Next run scheduled for {discord.utils.format_dt(next_dt, style='F')} ({discord.utils.format_dt(next_dt, style='R')}).",
-                ephemeral=True,
-            )
-            return
-        channel = await self.resolve_text_channel(config.get("channel_id"))
-        if not channel:
-            await interaction.followup.send("Configured channel no longer exists. Please update /set_prune_config.", ephemeral=True)
-            return
-        log_channel = await self.resolve_text_channel(config.get("log_channel_id"))
         extra_channel = interaction.channel if isinstance(interaction.channel, discord.TextChannel) else None
-        cutoff = datetime.utcnow() - timedelta(seconds=interval_sec)
-        deleted = await self.prune_channel(channel, cutoff, log_channel, extra_channel)
-        self.save_last(now_ts)
-        next_ts = self.next_timestamp(now_ts, interval_sec)
-        next_dt = datetime.utcfromtimestamp(next_ts)
-        await interaction.followup.send(
-            f"Prune complete in {channel.mention}. Deleted {deleted} message(s). Next run {discord.utils.format_dt(next_dt, style='R')}.",
-            ephemeral=True,
-        )
+        lines = []
+        for cid in targets:
+            next_ts = self.next_timestamp(cid)
+            if next_ts is None:
+                lines.append(f"<#{cid}>: invalid config, run /set_prune_config again.")
+            elif cid in self._running:
+                lines.append(f"<#{cid}>: a prune is already running.")
+            elif next_ts > time.time():
+                lines.append(f"<#{cid}>: too early, next run {_fmt(next_ts)}.")
+            else:
+                self._due.pop(cid, None)
+                deleted = await self.run_schedule(cid, extra_channel)
+                self._reschedule(cid)
+                if deleted is None:
+                    lines.append(f"<#{cid}>: channel no longer exists, update /set_prune_config.")
+                else:
+                    lines.append(f"<#{cid}>: deleted {deleted} message(s), next run {_fmt(self.next_timestamp(cid))}.")
+        await interaction.followup.send("\n".join(lines), ephemeral=True)
 
-    @app_commands.command(name="set_prune_config", description="Set auto prune schedule")
+    @app_commands.command(name="set_prune_config", description="Add or update an auto prune schedule")
     async def set_prune_config(
         self,
         interaction: discord.Interaction,
@@ -226,55 +341,64 @@ class Pruning(commands.Cog):
         unit: Literal["minutes", "hours", "days"],
         channel: discord.TextChannel,
         log_channel: discord.TextChannel,
+        images_only: bool = False,
     ):
         await interaction.response.defer(ephemeral=True)
-        config = {"interval": interval, "unit": unit, "channel_id": channel.id, "log_channel_id": log_channel.id}
-        self.save_config(config)
-        self.save_last(0)
-        interval_sec = self.interval_seconds(config)
-        cutoff = datetime.utcnow() - timedelta(seconds=interval_sec or 0)
-        await self.prune_channel(channel, cutoff, log_channel, interaction.channel)
-        self.save_last(datetime.utcnow().timestamp())
-        await interaction.followup.send(f"Auto prune every {interval} {unit} in {channel.mention}, logs in {log_channel.mention}", ephemeral=True)
+        self._reload_if_changed()
+        sched = {"interval": interval, "unit": unit, "log_channel_id": log_channel.id, "images_only": images_only}
+        if not self.interval_seconds(sched):
+            await interaction.followup.send("Interval must be a positive number.", ephemeral=True)
+            return
+        self.schedules[channel.id] = sched
+        self._store_schedules()
+        await self.run_schedule(channel.id, interaction.channel)
+        self._reschedule(channel.id)
+        kind = "images" if images_only else "attachments"
+        await interaction.followup.send(
+            f"Auto prune of {kind} every {interval} {unit} in {channel.mention}, logs in {log_channel.mention}", ephemeral=True)
+
+    @app_commands.command(name="remove_prune_config", description="Stop auto pruning a channel")
+    async def remove_prune_config(self, interaction: discord.Interaction, channel: discord.TextChannel):
+        self._reload_if_changed()
+        if self.schedules.pop(channel.id, None) is None:
+            await interaction.response.send_message(f"{channel.mention} has no prune schedule.", ephemeral=True)
+            return
+        self._due.pop(channel.id, None)
+        self._store_schedules()
+        await interaction.response.send_message(f"Stopped auto pruning {channel.mention}.", ephemeral=True)
 
     @app_commands.command(name="forcerun", description="Force an immediate auto-prune run with current config")
-    async def forcerun(self, interaction: discord.Interaction):
+    @app_commands.describe(channel="Only this configured channel (default: every configured channel)")
+    async def forcerun(self, interaction: discord.Interaction, channel: discord.TextChannel | None = None):
         await interaction.response.defer(ephemeral=True)
-        config = self.load_config()
-        if not config:
+        targets = self._targets(channel)
+        if not targets:
             await interaction.followup.send("No valid prune config set", ephemeral=True)
             return
-        channel = await self.resolve_text_channel(config.get("channel_id"))
-        log_channel = await self.resolve_text_channel(config.get("log_channel_id"))
-        if not channel:
-            await interaction.followup.send("Configured channel not found", ephemeral=True)
-            return
-        interval_sec = self.interval_seconds(config)
-        if not interval_sec:
-            await interaction.followup.send("Invalid prune config. Please run /set_prune_config.", ephemeral=True)
-            return
-        cutoff = datetime.utcnow() - timedelta(seconds=interval_sec)
-        await self.prune_channel(channel, cutoff, log_channel, interaction.channel)
-        self.save_last(datetime.utcnow().timestamp())
-        await interaction.followup.send(f"Forced prune executed for {channel.mention}", ephemeral=True)
+        done = []
+        for cid in targets:
+            self._due.pop(cid, None)
+            deleted = await self.run_schedule(cid, interaction.channel)
+            self._reschedule(cid)
+            done.append(f"<#{cid}>" if deleted is not None else f"<#{cid}> (not found or invalid config)")
+        await interaction.followup.send(f"Forced prune executed for {', '.join(done)}", ephemeral=True)
 
-    @app_commands.command(name="next_prune", description="Show next scheduled prune time")
+    @app_commands.command(name="next_prune", description="Show next scheduled prune times")
     async def next_prune(self, interaction: discord.Interaction):
-        config = self.load_config()
-        if not config:
+        self._reload_if_changed()
+        if not self.schedules:
             await interaction.response.send_message("No prune config set", ephemeral=True)
             return
-        last_ts = self.load_last()
-        interval_sec = self.interval_seconds(config)
-        if not interval_sec:
-            await interaction.response.send_message("Stored config invalid. Please re-run /set_prune_config.", ephemeral=True)
-            return
-        next_ts = self.next_timestamp(last_ts, interval_sec)
-        next_time = datetime.utcfromtimestamp(next_ts)
-        await interaction.response.send_message(
-            f"Next prune scheduled for {discord.utils.format_dt(next_time, style='F')} ({discord.utils.format_dt(next_time, style='R')})",
-            ephemeral=True,
-        )
+        lines = []
+        for cid, sched in sorted(self.schedules.items(), key=lambda kv: self.next_timestamp(kv[0]) or 0):
+            next_ts = self.next_timestamp(cid)
+            if next_ts is None:
+                lines.append(f"<#{cid}>: stored config invalid, re-run /set_prune_config.")
+                continue
+            kind = "images" if sched.get("images_only") else "attachments"
+            status = "running now" if cid in self._running else _fmt(max(next_ts, time.time()))
+            lines.append(f"<#{cid}> ({kind}, every {sched['interval']} {sched['unit']}): {status}")
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(Pruning(bot))
@@ -1,14 +1,17 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import io
 import json
-import csv
-import re
 import asyncio
+import itertools
 import os
 from datetime import datetime, timezone
 from dotenv import load_dotenv
+from commands.message_index import get_index, history_records
+from utils.crawler import crawl_channels
+from utils.csv_sink import CsvSink
+from utils.match_executor import MatchExecutor, MATCH_BATCH
+from utils.scan_jobs import ScanJob
 
 class RegexScan(commands.Cog):
     def __init__(self, bot: commands.Bot):
@@ -37,66 +40,143 @@ class RegexScan(commands.Cog):
                 await interaction.followup.send("Regex file must be a JSON array or object with regex strings.")
                 return
 
-            compiled = [re.compile(p) for p in patterns]
+            compiled = MatchExecutor(patterns)
         except Exception as e:
             await interaction.followup.send(f"Failed to load regex file: {e}")
             return
 
         channels = [c for c in interaction.guild.text_channels if c.permissions_for(interaction.guild.me).read_message_history]
-        total = len(channels)
-        matches = []
-
-        progress_msg = await interaction.followup.send(f"Scanning {total} channels... [----------] 0%")
+        job = ScanJob.create("regexscan", interaction.guild.id, interaction.user.id,
+                             [c.id for c in channels], {"patterns": patterns})
+        await self.run_scan(interaction, job, compiled)
+
+    async def run_scan(self, interaction: discord.Interaction, job: ScanJob, compiled: MatchExecutor | None = None):
+        """Scan (or keep scanning) the channels of a regexscan job, checkpointing as it goes."""
+        if not job.claim():
+            await interaction.followup.send(f"Scan `{job.id}` is already running.")
+            return
+        try:
+            await self._scan_claimed(interaction, job, compiled)
+        finally:
+            job.release()
+
+    async def _scan_claimed(self, interaction: discord.Interaction, job: ScanJob, compiled: MatchExecutor | None):
+        guild = interaction.guild
+        compiled = compiled or MatchExecutor(job.params["patterns"])
+        compiled.pathological.update(job.state.get("pathological", []))
+        channels = [ch for cid in job.pending_channels() if (ch := guild.get_channel(cid)) is not None]
+        total = len(job.channel_ids)
+        found_channels = set()
+
+        def keep(row):
+            try:
+                cid, mid = int(row[1]), int(row[0])
+            except (IndexError, ValueError):
+                return False  # a row cut short by a crash mid-write
+            if job.is_done(cid) or mid <= (job.cursor(cid) or 0):
+                found_channels.add(cid)
+                return True
+            return False
+
+        sink = CsvSink(["message_id", "channel_id", "author_id", "created_at", "content", "pattern", "link"],
+                       "regex_matches.csv", path=job.results_path, keep=keep)
+
+        done = total - len(channels)
+        progress_msg = await interaction.followup.send(
+            f"Scanning {total} channels... [----------] {int(done / max(total, 1) * 100)}%\n"
+            f"Job `{job.id}`: if the bot restarts, continue with `/scan resume`.")
         last_edit = 0.0
         EDIT_INTERVAL = 2.0
 
-        for i, channel in enumerate(channels, 1):
+        index = get_index(self.bot)
+        pending = []
+        inflight = []
+        seen: dict[int, int] = {}
+        finished: set[int] = set()
+
+        def checkpoint():
+            # a channel's cursor stops short of its oldest message still waiting to be matched
+            low: dict[int, int] = {}
+            for channel, rec in itertools.chain(pending, *inflight):
+                low[channel.id] = min(low.get(channel.id, rec.id), rec.id)
+            cursors = {cid: low[cid] - 1 if cid in low else mid for cid, mid in seen.items()}
+            sink.flush()
+            job.checkpoint(cursors, finished - low.keys(), pathological=sorted(compiled.pathological))
+
+        async def run_batch(batch):
+            if not batch:
+                return
+            inflight.append(batch)
             try:
-                async for msg in channel.history(limit=None):
-                    for pat in compiled:
-                        if pat.search(msg.content or ""):
-                            snippet = msg.content.replace("\n", " ")[:200]
-                            link = f"https://discord.com/channels/{interaction.guild.id}/{channel.id}/{msg.id}"
-                            matches.append([
-                                msg.id,
-                                channel.id,
-                                msg.author.id,
-                                msg.created_at.isoformat(),
-                                snippet,
-                                pat.pattern,
-                                link
-                            ])
-            except discord.Forbidden:
-                continue
-            except discord.HTTPException:
-                await asyncio.sleep(1)
-                continue
-
+                results = await compiled.match([rec.content for _, rec in batch])
+                for (channel, rec), hits in zip(batch, results):
+                    for i in hits:
+                        pat = compiled.patterns[i]
+                        snippet = rec.content.replace("\n", " ")[:200]
+                        link = f"https://discord.com/channels/{guild.id}/{channel.id}/{rec.id}"
+                        found_channels.add(channel.id)
+                        sink.writerow([
+                            rec.id,
+                            channel.id,
+                            rec.author_id,
+                            rec.created_at.isoformat(),
+                            snippet,
+                            pat.pattern,
+                            link
+                        ])
+            finally:
+                inflight.remove(batch)
+            if job.due():
+                checkpoint()
+
+        async def check(channel, rec):
+            nonlocal pending
+            seen[channel.id] = rec.id
+            pending.append((channel, rec))
+            if len(pending) >= MATCH_BATCH:
+                batch, pending = pending, []
+                await run_batch(batch)
+
+        def source(channel):
+            after = job.cursor(channel.id)
+            if index:
+                return index.records(channel, after_id=after or 0)
+            return history_records(channel, after=discord.Object(id=after) if after else None, oldest_first=True)
+
+        async def channel_done(channel, ok):
+            nonlocal done, last_edit
+            done += 1
+            finished.add(channel.id)
+            if job.due():
+                checkpoint()
             now = asyncio.get_event_loop().time()
             if now - last_edit > EDIT_INTERVAL:
-                pct = int((i / total) * 100)
+                pct = int((done / total) * 100)
                 bar_len = 10
                 filled = int(bar_len * pct / 100)
                 bar = "█" * filled + "-" * (bar_len - filled)
-                await progress_msg.edit(content=f"Scanning {total} channels... [{bar}] {pct}%")
                 last_edit = now
+                await progress_msg.edit(content=f"Scanning {total} channels... [{bar}] {pct}%")
 
-        if not matches:
-            await progress_msg.edit(content="Scan complete. No matches found.")
-            return
+        with sink, compiled:
+            await crawl_channels(channels, check, source=source, on_channel_done=channel_done)
+            batch, pending = pending, []
+            await run_batch(batch)
+            checkpoint()
 
-        output = io.StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["message_id", "channel_id", "author_id", "created_at", "content", "pattern", "link"])
-        writer.writerows(matches)
-        output.seek(0)
+            skipped = ""
+            if compiled.pathological:
+                names = ", ".join(f"`{compiled.patterns[i].pattern[:60]}`" for i in sorted(compiled.pathological))
+                skipped = f"\nSkipped {len(compiled.pathological)} pattern(s) that timed out: {names}"[:1000]
 
-        file = discord.File(io.BytesIO(output.getvalue().encode()), filename="regex_matches.csv")
-        found_channels = len(set(m[1] for m in matches))
-        summary = f"Scan complete. Found {len(matches)} matches in {found_channels} channels."
+            if not sink.rows:
+                await progress_msg.edit(content="Scan complete. No matches found." + skipped)
+            else:
+                summary = f"Scan complete. Found {sink.rows} matches in {len(found_channels)} channels." + skipped
 
-        await progress_msg.edit(content=summary)
-        await interaction.followup.send(file=file)
+                await progress_msg.edit(content=summary)
+                await sink.send(interaction.followup.send, limit=guild.filesize_limit)
+        job.discard()
 LOG_CHANNEL_ID = int(os.getenv("BLACKBIRDLOGS_ID", "0"))
 BEGIN_AGAIN_VIDEO_PATH = os.getenv("PURGE_VIDEO_PATH", "vhs_dead_money_sc_5mb.mp4")
 
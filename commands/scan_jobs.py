@@ -0,0 +1,72 @@
+from discord import app_commands, Interaction
+from discord.ext import commands
+from commands import general
+from utils.scan_jobs import ScanJob
+
+
+class ScanJobs(commands.Cog):
+    """Lists and resumes regexscan / trace_act jobs that were interrupted."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    scan = app_commands.Group(name="scan", description="Interrupted channel scans")
+
+    def _find(self, guild_id: int, job_id: str | None) -> ScanJob | None:
+        if job_id:
+            job = ScanJob.load(job_id)
+            return job if job and job.guild_id == guild_id else None
+        return next((j for j in ScanJob.for_guild(guild_id) if not j.running), None)
+
+    @scan.command(name="list", description="Show scans that can be resumed")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def list_jobs(self, interaction: Interaction):
+        jobs = ScanJob.for_guild(interaction.guild_id)
+        if not jobs:
+            await interaction.response.send_message("No saved scans.", ephemeral=True)
+            return
+        lines = []
+        for job in jobs[:15]:
+            total = len(job.channel_ids)
+            left = len(job.pending_channels())
+            status = "running" if job.running else "stopped"
+            lines.append(f"`{job.id}` • {job.kind} • {total - left}/{total} channels • {status} • "
+                         f"updated <t:{int(job.data['updated'])}:R>")
+        await interaction.response.send_message("\n".join(lines), ephemeral=True)
+
+    @scan.command(name="resume", description="Continue an interrupted scan from its last checkpoint")
+    @app_commands.describe(job_id="Job id from /scan list (default: the most recent stopped scan)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def resume(self, interaction: Interaction, job_id: str | None = None):
+        job = self._find(interaction.guild_id, job_id)
+        if job is None:
+            await interaction.response.send_message("No such scan.", ephemeral=True)
+            return
+        if job.kind == "regexscan":
+            cog = self.bot.get_cog("RegexScan")
+            if cog is None:
+                await interaction.response.send_message("The regexscan module isn't loaded.", ephemeral=True)
+                return
+            await interaction.response.defer(ephemeral=False, thinking=True)
+            await cog.run_scan(interaction, job)
+        elif job.kind == "trace_act":
+            await interaction.response.defer(ephemeral=True)
+            await general.run_trace_act(interaction, job)
+        else:
+            await interaction.response.send_message(f"Don't know how to resume a `{job.kind}` scan.", ephemeral=True)
+
+    @scan.command(name="discard", description="Delete a saved scan and its partial results")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def discard(self, interaction: Interaction, job_id: str):
+        job = self._find(interaction.guild_id, job_id)
+        if job is None:
+            await interaction.response.send_message("No such scan.", ephemeral=True)
+            return
+        if job.running:
+            await interaction.response.send_message("That scan is still running.", ephemeral=True)
+            return
+        job.discard()
+        await interaction.response.send_message(f"Discarded `{job.id}`.", ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(ScanJobs(bot))
@@ -2,13 +2,13 @@ import discord
 from discord import app_commands, Interaction, TextStyle
 from discord.ext import commands
 from discord.ui import View, Button, Modal, TextInput, Select
-import sqlite3
 import os
 import io
 import csv
 import asyncio
 from datetime import datetime
 from dotenv import load_dotenv
+from utils.db import Database
 
 load_dotenv()
 
@@ -32,29 +32,28 @@ ALLOWED_CLOSE_ROLES = ["Admin", "Moderator", "Staff"]
 DB_PATH = "tickets.db"
 
 
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute(
-        """
-        CREATE TABLE IF NOT EXISTS tickets (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            ticket_type TEXT,
-            title TEXT,
-            description TEXT,
-            status TEXT,
-            claimer_id INTEGER,
-            channel_id INTEGER,
-            created_at TEXT
-        )
-        """
+MIGRATIONS = [
+    # 1: original table, created with IF NOT EXISTS so existing files just get stamped
+    """
+    CREATE TABLE IF NOT EXISTS tickets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        ticket_type TEXT,
+        title TEXT,
+        description TEXT,
+        status TEXT,
+        claimer_id INTEGER,
+        channel_id INTEGER,
+        created_at TEXT
     )
-    conn.commit()
-    conn.close()
+    """,
+    # 2: viewtickets filters on status + ticket_type, closing a ticket looks it up by channel
+    ["CREATE INDEX IF NOT EXISTS idx_tickets_status_type ON tickets(status, ticket_type)",
+     "CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets(channel_id)"],
+]
 
 
-init_db()
+db = Database(DB_PATH, migrations=MIGRATIONS)
 
 
 def get_allowed_types(member: discord.Member):
@@ -71,8 +70,12 @@ class TicketSystem(commands.Cog):
         self.bot = bot
 
     async def cog_load(self):
+        await db.connect()
         self.bot.add_view(TicketPanelView())
 
+    async def cog_unload(self):
+        await db.close()
+
     @app_commands.command(name="setup_ticket_panel", description="Post the ticket creation panel.")
     async def setup_ticket_panel(self, interaction: Interaction):
         await interaction.response.defer(ephemeral=True)
@@ -98,15 +101,11 @@ class TicketSystem(commands.Cog):
         if not allowed:
             await interaction.followup.send("You are not allowed to view tickets.", ephemeral=True)
             return
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
         placeholders = ",".join("?" for _ in allowed)
-        c.execute(
+        rows = await db.fetchall(
             f"SELECT id, ticket_type, title, user_id, created_at FROM tickets WHERE status='OPEN' AND ticket_type IN ({placeholders}) ORDER BY id ASC",
-            tuple(allowed),
+            sorted(allowed),
         )
-        rows = c.fetchall()
-        conn.close()
         if not rows:
             await interaction.followup.send("No open tickets you can claim.", ephemeral=True)
             return
@@ -128,23 +127,17 @@ class TicketSystem(commands.Cog):
         if not interaction.guild or not isinstance(interaction.user, discord.Member):
             await interaction.followup.send("Use this in a server.", ephemeral=True)
             return
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT user_id, ticket_type, title, description, status FROM tickets WHERE id=?", (ticket_id,))
-        row = c.fetchone()
+        row = await db.fetchone("SELECT user_id, ticket_type, title, description, status FROM tickets WHERE id=?", (ticket_id,))
         if not row:
             await interaction.followup.send("Ticket not found.", ephemeral=True)
-            conn.close()
             return
         user_id, ticket_type, title, desc, status = row
         if status != "OPEN":
             await interaction.followup.send("That ticket is already claimed or closed.", ephemeral=True)
-            conn.close()
             return
         allowed = get_allowed_types(interaction.user)
         if ticket_type not in allowed:
             await interaction.followup.send("You are not allowed to claim this ticket type.", ephemeral=True)
-            conn.close()
             return
         member = interaction.guild.get_member(user_id)
         cfg = TICKET_CATEGORIES[ticket_type]
@@ -172,9 +165,7 @@ class TicketSystem(commands.Cog):
             msg_intro += f" for {member.mention}"
         await channel.send(msg_intro + ".", embed=embed, view=view)
         await interaction.followup.send(f"Ticket #{ticket_id} claimed. {channel.mention}", ephemeral=True)
-        c.execute("UPDATE tickets SET status='CLAIMED', claimer_id=?, channel_id=? WHERE id=?", (interaction.user.id, channel.id, ticket_id))
-        conn.commit()
-        conn.close()
+        await db.execute("UPDATE tickets SET status='CLAIMED', claimer_id=?, channel_id=? WHERE id=?", (interaction.user.id, channel.id, ticket_id))
 
 
 class TicketQueueView(View):
@@ -252,14 +243,10 @@ class TicketModal(Modal, title="New Ticket"):
 
     async def on_submit(self, interaction: Interaction):
         await interaction.response.defer(ephemeral=True)
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute(
+        await db.execute(
             "INSERT INTO tickets (user_id, ticket_type, title, description, status, created_at) VALUES (?, ?, ?, ?, 'OPEN', ?)",
             (interaction.user.id, self.ticket_type, self.title_input.value, self.desc_input.value, datetime.now().strftime("%Y-%m-%d %H:%M")),
         )
-        conn.commit()
-        conn.close()
         await interaction.followup.send("Your ticket has been submitted to the queue.", ephemeral=True)
         if WAITING_CHANNEL_ID and interaction.guild:
             channel = interaction.client.get_channel(WAITING_CHANNEL_ID)
@@ -292,11 +279,12 @@ class TicketCloseButton(Button):
             return
         channel = interaction.channel
         closer = interaction.user
-        messages = [m async for m in channel.history(limit=None, oldest_first=True)]
         log_buffer = io.StringIO()
         writer = csv.writer(log_buffer)
         writer.writerow(["Timestamp", "Author", "Message", "Attachments"])
-        for m in messages:
+
+        # a failed read must raise here, before the channel is deleted below
+        async for m in channel.history(limit=None, oldest_first=True):
             text = m.clean_content.replace("\n", " ") if m.clean_content else ""
             attachments = ", ".join(a.url for a in m.attachments) if m.attachments else ""
             writer.writerow([m.created_at.isoformat(), m.author.display_name, text, attachments])
@@ -312,11 +300,7 @@ class TicketCloseButton(Button):
                     embed.add_field(name="Opened by", value=self.opener.mention, inline=True)
                 embed.add_field(name="Closed by", value=closer.mention, inline=True)
                 await log_channel.send(embed=embed, file=csv_file)
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("UPDATE tickets SET status='CLOSED' WHERE channel_id=?", (channel.id,))
-        conn.commit()
-        conn.close()
+        await db.execute("UPDATE tickets SET status='CLOSED' WHERE channel_id=?", (channel.id,))
         await channel.send(f"Ticket closed by {closer.mention}. Channel deleting in 5s.")
         await asyncio.sleep(5)
         await channel.delete()
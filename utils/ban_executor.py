@@ -0,0 +1,121 @@
+from __future__ import annotations
+import asyncio
+import os
+import random
+from typing import Awaitable, Callable
+
+import discord
+
+BULK_BAN_MAX = 200
+BAN_WORKERS = int(os.getenv("BAN_WORKERS", "4"))
+_RETRIES = 4
+_BACKOFF = 1.0  # seconds before the first retry; doubles each time
+
+
+def _error(e: Exception) -> str:
+    if isinstance(e, discord.HTTPException):
+        return f"{e.status} {e.text or type(e).__name__}"[:200]
+    return f"{type(e).__name__}: {e}"[:200]
+
+
+class BanExecutor:
+    """Bans many users in one guild and records a result per user id.
+
+    Users are grouped by reason and sent through `guild.bulk_ban` 200 at a
+    time; ids the bulk call reports as failed (and every id, if bulk banning
+    is unavailable or forbidden) are retried with single bans by a pool of
+    `workers` tasks. discord.py already waits out rate limits per route, so
+    retries here only cover a 429 it gave up on and transient 5xx errors,
+    with exponential backoff.
+    """
+
+    def __init__(self, guild: discord.Guild, *, workers: int = BAN_WORKERS,
+                 on_progress: Callable[[int, int], Awaitable] | None = None):
+        self.guild = guild
+        self.workers = max(1, workers)
+        self.on_progress = on_progress
+        self.results: dict[int, str | None] = {}  # user id -> None if banned, else the error
+        self._bulk = hasattr(guild, "bulk_ban")
+        self._total = 0
+
+    @property
+    def banned(self) -> int:
+        return sum(1 for err in self.results.values() if err is None)
+
+    @property
+    def failed(self) -> int:
+        return len(self.results) - self.banned
+
+    async def run(self, targets: dict[int, str]) -> dict[int, str | None]:
+        """Ban every `user id -> reason` in `targets`; returns `results`."""
+        targets = {uid: reason for uid, reason in targets.items() if uid not in self.results}
+        self._total += len(targets)
+        by_reason: dict[str, list[int]] = {}
+        for uid, reason in targets.items():
+            by_reason.setdefault(reason, []).append(uid)
+
+        singles: asyncio.Queue = asyncio.Queue()
+        chunks: asyncio.Queue = asyncio.Queue()
+        for reason, ids in by_reason.items():
+            for i in range(0, len(ids), BULK_BAN_MAX):
+                chunks.put_nowait((reason, ids[i:i + BULK_BAN_MAX]))
+
+        workers = [asyncio.create_task(self._single_worker(singles)) for _ in range(self.workers)]
+        try:
+            # bulk bans share one per-guild bucket, so one task sends them all
+            await self._bulk_worker(chunks, singles)
+            await singles.join()
+        finally:
+            for w in workers:
+                w.cancel()
+        return self.results
+
+    async def _record(self, uid: int, err: str | None):
+        self.results[uid] = err
+        if self.on_progress:
+            await self.on_progress(len(self.results), self._total)
+
+    async def _bulk_worker(self, chunks: asyncio.Queue, singles: asyncio.Queue):
+        while not chunks.empty():
+            reason, ids = chunks.get_nowait()
+            if not self._bulk:
+                for uid in ids:
+                    singles.put_nowait((uid, reason))
+                continue
+            try:
+                res = await self._retry(lambda: self.guild.bulk_ban([discord.Object(id=u) for u in ids], reason=reason))
+            except discord.Forbidden:
+                self._bulk = False  # needs Manage Server on top of Ban Members
+                res = None
+            except discord.HTTPException:
+                res = None  # e.g. nobody in the chunk could be banned
+            ok = {u.id for u in res.banned} if res else set()
+            for uid in ids:
+                if uid in ok:
+                    await self._record(uid, None)
+                else:
+                    singles.put_nowait((uid, reason))
+
+    async def _single_worker(self, singles: asyncio.Queue):
+        while True:
+            uid, reason = await singles.get()
+            try:
+                await self._retry(lambda: self.guild.ban(discord.Object(id=uid), reason=reason))
+                err = None
+            except Exception as e:
+                err = _error(e)
+            try:
+                await self._record(uid, err)
+            finally:
+                singles.task_done()
+
+    async def _retry(self, call: Callable[[], Awaitable]):
+        for attempt in range(1, _RETRIES + 1):
+            try:
+                return await call()
+            except (discord.RateLimited, discord.HTTPException) as e:
+                status = 429 if isinstance(e, discord.RateLimited) else e.status
+                if attempt == _RETRIES or not (status == 429 or status >= 500):
+                    raise
+                delay = getattr(e, "retry_after", None) or _BACKOFF * 2 ** (attempt - 1)
+            await asyncio.sleep(delay + random.uniform(0, 0.5))
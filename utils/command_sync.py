@@ -0,0 +1,133 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import discord
+from discord import app_commands
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+STATE_PATH = BASE_DIR / "data" / "command_sync.json"
+
+
+def _payload(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> list[dict]:
+    out = []
+    for cmd in tree.get_commands(guild=guild):
+        try:
+            out.append(cmd.to_dict(tree))
+        except TypeError:  # discord.py < 2.4
+            out.append(cmd.to_dict())
+    return sorted(out, key=lambda d: (d.get("type", 1), d["name"]))
+
+
+def _normalise(payload: list[dict]) -> list[dict]:
+    # round-trip through JSON so stored and freshly built payloads compare equal
+    return json.loads(json.dumps(payload, sort_keys=True, default=str))
+
+
+def schema(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> list[dict]:
+    """The command payload Discord would receive for a sync."""
+    return _normalise(_payload(tree, guild))
+
+
+def fingerprint(payload: list[dict]) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class SchemaDiff:
+    added: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    changed: dict[str, list[str]] = field(default_factory=dict)
+    unknown: bool = False  # nothing stored to compare against
+
+    def __bool__(self):
+        return self.unknown or bool(self.added or self.removed or self.changed)
+
+    def summary(self) -> str:
+        if self.unknown:
+            return "No record of a previous sync."
+        if not self:
+            return "No changes."
+        lines = []
+        if self.added:
+            lines.append("Added: " + ", ".join(f"`{n}`" for n in self.added))
+        if self.removed:
+            lines.append("Removed: " + ", ".join(f"`{n}`" for n in self.removed))
+        for name, fields in self.changed.items():
+            lines.append(f"Changed `{name}`: {', '.join(fields)}")
+        return "\n".join(lines)
+
+
+def _label(cmd: dict) -> str:
+    kind = cmd.get("type", 1)
+    return cmd["name"] if kind == 1 else f"{cmd['name']} ({'user' if kind == 2 else 'message'} menu)"
+
+
+def compare(old: list[dict] | None, new: list[dict]) -> SchemaDiff:
+    if old is None:
+        return SchemaDiff(unknown=True)
+    before = {(c.get("type", 1), c["name"]): c for c in old}
+    after = {(c.get("type", 1), c["name"]): c for c in new}
+    out = SchemaDiff()
+    out.added = [_label(after[k]) for k in sorted(after.keys() - before.keys())]
+    out.removed = [_label(before[k]) for k in sorted(before.keys() - after.keys())]
+    for k in sorted(after.keys() & before.keys()):
+        a, b = before[k], after[k]
+        fields = sorted(f for f in a.keys() | b.keys() if a.get(f) != b.get(f))
+        if fields:
+            out.changed[_label(b)] = fields
+    return out
+
+
+@dataclass
+class SyncResult:
+    diff: SchemaDiff
+    synced: list[app_commands.AppCommand] | None = None  # None when the sync was skipped
+
+
+def _load() -> dict:
+    try:
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save(state: dict):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_PATH.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_PATH)
+
+
+def _key(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None) -> str:
+    # per application, so a token swap doesn't reuse another bot's state
+    return f"{tree.client.application_id}:{guild.id if guild else 'global'}"
+
+
+def _stored(state: dict, key: str) -> dict:
+    entry = state.get(key)
+    return entry if isinstance(entry, dict) else {"hash": entry, "commands": None}
+
+
+async def sync_if_changed(tree: app_commands.CommandTree, *, guild: discord.abc.Snowflake | None = None,
+                          force: bool = False) -> SyncResult:
+    """Sync the tree unless it matches what was last pushed."""
+    key = _key(tree, guild)
+    payload = schema(tree, guild)
+    fp = fingerprint(payload)
+    state = _load()
+    last = _stored(state, key)
+    result = SyncResult(compare(last["commands"], payload))
+    if last["hash"] == fp:
+        result.diff = SchemaDiff()
+        if not force:
+            return result
+    result.synced = await tree.sync(guild=guild)
+    state[key] = {"hash": fp, "commands": payload}
+    _save(state)
+    return result
@@ -0,0 +1,44 @@
+from __future__ import annotations
+import heapq
+from typing import Hashable
+
+
+class CooldownTable:
+    """Per-key cooldowns that forget keys once their cooldown has run out.
+
+    Expiries sit in a min-heap and are swept lazily on each `hit`, so the
+    table only ever holds keys that are still cooling down.
+    """
+
+    def __init__(self):
+        self._until: dict[Hashable, float] = {}
+        self._heap: list[tuple[float, int, Hashable]] = []
+        self._tie = 0
+
+    def __len__(self) -> int:
+        return len(self._until)
+
+    def sweep(self, now: float) -> int:
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            until, _, key = heapq.heappop(heap)
+            if self._until.get(key) == until:
+                del self._until[key]
+                removed += 1
+        return removed
+
+    def hit(self, key: Hashable, now: float, cooldown: float) -> bool:
+        """Start `key`'s cooldown and return True, or False if it is still cooling down."""
+        self.sweep(now)
+        if key in self._until:
+            return False
+        until = now + cooldown
+        self._until[key] = until
+        self._tie += 1
+        heapq.heappush(self._heap, (until, self._tie, key))
+        return True
+
+    def clear(self):
+        self._until.clear()
+        self._heap.clear()
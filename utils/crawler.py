@@ -0,0 +1,126 @@
+from __future__ import annotations
+import asyncio
+import inspect
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+import discord
+
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", "4"))
+# history pages (100 messages each) per second across every worker; discord.py
+# already waits on per-route buckets, this keeps a big crawl under the global cap
+CRAWL_PAGES_PER_SEC = float(os.getenv("CRAWL_PAGES_PER_SEC", "25"))
+PAGE_SIZE = 100
+
+
+class RateBudget:
+    """Token bucket shared by every crawl worker."""
+
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._stamp = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_budget: RateBudget | None = None
+
+
+def shared_budget() -> RateBudget:
+    global _budget
+    if _budget is None:
+        _budget = RateBudget(CRAWL_PAGES_PER_SEC)
+    return _budget
+
+
+async def paced_history(channel: discord.abc.Messageable, *, budget: RateBudget | None = None, **kwargs):
+    """channel.history(**kwargs), taking a budget token for every page it requests."""
+    budget = budget or shared_budget()
+    kwargs.setdefault("limit", None)
+    n = 0
+    await budget.acquire()
+    async for msg in channel.history(**kwargs):
+        n += 1
+        if n % PAGE_SIZE == 0:
+            await budget.acquire()
+        yield msg
+
+
+@dataclass
+class CrawlResult:
+    scanned: int = 0
+    items: int = 0
+    skipped: list[Any] = field(default_factory=list)
+
+
+async def _maybe_await(value):
+    if inspect.isawaitable(value):
+        await value
+
+
+async def crawl_channels(
+    channels: Iterable[discord.abc.Messageable],
+    consumer: Callable[[Any, Any], Awaitable[None] | None],
+    *,
+    source: Callable[[Any], AsyncIterator[Any]] | None = None,
+    workers: int = CRAWL_WORKERS,
+    on_channel_done: Callable[[Any, bool], Awaitable[None] | None] | None = None,
+    budget: RateBudget | None = None,
+    **history_kwargs,
+) -> CrawlResult:
+    """Read several channels at once and hand every item to `consumer(channel, item)`.
+
+    Items come from `source(channel)` when given, otherwise from
+    `channel.history(**history_kwargs)` (limit defaults to None), paced by
+    `budget`. Channels the bot can't read are recorded in `skipped` instead
+    of raising.
+    """
+    history_kwargs.setdefault("limit", None)
+    budget = budget or shared_budget()
+    queue: asyncio.Queue = asyncio.Queue()
+    for ch in channels:
+        queue.put_nowait(ch)
+    result = CrawlResult()
+
+    async def crawl_one(channel):
+        # a source may read the local index, so it isn't charged here; one that
+        # calls the API goes through paced_history itself
+        it = source(channel) if source else paced_history(channel, budget=budget, **history_kwargs)
+        async for item in it:
+            result.items += 1
+            await _maybe_await(consumer(channel, item))
+
+    async def worker():
+        while True:
+            try:
+                channel = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            ok = True
+            try:
+                await crawl_one(channel)
+            except (discord.Forbidden, discord.HTTPException):
+                ok = False
+                result.skipped.append(channel)
+            result.scanned += 1
+            if on_channel_done:
+                await _maybe_await(on_channel_done(channel, ok))
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, queue.qsize())))))
+    return result
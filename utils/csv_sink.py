@@ -0,0 +1,173 @@
+from __future__ import annotations
+import csv
+import gzip
+import io
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable
+
+import discord
+
+# Discord's default attachment limit; pass guild.filesize_limit when there is a guild
+UPLOAD_LIMIT = int(os.getenv("UPLOAD_LIMIT_BYTES", str(10 * 1024 * 1024)))
+SPOOL_BYTES = 1024 * 1024
+FILES_PER_MESSAGE = 10
+_CHUNK = 256 * 1024
+
+
+class CsvSink:
+    """CSV rows streamed to a spooled temp file instead of an in-memory list.
+
+    `files()` returns the result as one .csv when it fits the upload limit,
+    one .csv.gz when compression makes it fit, and otherwise as several
+    .csv.gz parts that each repeat the header.
+
+    With `path` the rows go to that file instead and survive a restart;
+    reopening it appends, keeping only the existing rows `keep(row)` accepts.
+    """
+
+    def __init__(self, header: list[str], filename: str, *, path: str | Path | None = None,
+                 keep: Callable[[list[str]], bool] | None = None):
+        self.header = list(header)
+        self.filename = filename
+        self.path = Path(path) if path else None
+        self.rows = 0
+        reopened = False
+        if self.path is None:
+            self._raw = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, mode="w+b")
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists():
+                self._reopen(keep)
+                reopened = True
+            self._raw = open(self.path, "a+b")
+        self._text = io.TextIOWrapper(self._raw, encoding="utf-8", newline="", write_through=True)
+        self._writer = csv.writer(self._text)
+        if not reopened:
+            self._writer.writerow(self.header)
+
+    def _reopen(self, keep):
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(self.path, newline="", encoding="utf-8") as src, \
+                open(tmp, "w", newline="", encoding="utf-8") as dst:
+            reader = csv.reader(src)
+            next(reader, None)
+            writer = csv.writer(dst)
+            writer.writerow(self.header)
+            for row in reader:
+                if keep is None or keep(row):
+                    writer.writerow(row)
+                    self.rows += 1
+        os.replace(tmp, self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def writerow(self, row: Iterable):
+        self._writer.writerow(row)
+        self.rows += 1
+
+    def writerows(self, rows: Iterable[Iterable]):
+        for row in rows:
+            self.writerow(row)
+
+    def close(self):
+        if not self._raw.closed:
+            self._raw.close()
+
+    def flush(self):
+        """Push written rows to disk (for a `path` sink, so a checkpoint can rely on them)."""
+        self._text.flush()
+        self._raw.flush()
+        if self.path is not None:
+            os.fsync(self._raw.fileno())
+
+    def _size(self) -> int:
+        self._text.flush()
+        self._raw.seek(0, io.SEEK_END)
+        return self._raw.tell()
+
+    def files(self, limit: int = UPLOAD_LIMIT) -> list[discord.File]:
+        """Package what was written so far as upload-sized attachments."""
+        size = self._size()
+        self._raw.seek(0)
+        if size <= limit:
+            data = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+            shutil.copyfileobj(self._raw, data, _CHUNK)
+            data.seek(0)
+            return [discord.File(data, filename=self.filename)]
+
+        packed = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+        with gzip.GzipFile(fileobj=packed, mode="wb") as gz:
+            shutil.copyfileobj(self._raw, gz, _CHUNK)
+        if packed.tell() <= limit:
+            packed.seek(0)
+            return [discord.File(packed, filename=f"{self.filename}.gz")]
+        packed.close()
+        return self._split(limit)
+
+    def _split(self, limit: int) -> list[discord.File]:
+        # zlib holds back some output until it's flushed, so leave headroom
+        target = max(limit - max(limit // 8, 64 * 1024), limit // 2)
+        stem = Path(self.filename).stem
+        suffix = Path(self.filename).suffix or ".csv"
+        self._raw.seek(0)
+        reader = csv.reader(io.TextIOWrapper(_Unclosable(self._raw), encoding="utf-8", newline=""))
+        next(reader, None)
+        parts: list[tuple[tempfile.SpooledTemporaryFile, gzip.GzipFile, io.TextIOWrapper]] = []
+
+        def new_part():
+            fp = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES)
+            gz = gzip.GzipFile(fileobj=fp, mode="wb")
+            text = io.TextIOWrapper(gz, encoding="utf-8", newline="", write_through=True)
+            csv.writer(text).writerow(self.header)
+            parts.append((fp, gz, text))
+            return fp, text, csv.writer(text)
+
+        fp, text, writer = new_part()
+        written = 0
+        for row in reader:
+            if written and fp.tell() >= target:
+                text.detach(); parts[-1][1].close()
+                fp, text, writer = new_part()
+                written = 0
+            writer.writerow(row)
+            written += 1
+        text.detach(); parts[-1][1].close()
+
+        out = []
+        for n, (fp, _, _) in enumerate(parts, 1):
+            fp.seek(0)
+            out.append(discord.File(fp, filename=f"{stem}.part{n}{suffix}.gz"))
+        return out
+
+    async def send(self, send: Callable[..., Awaitable], content: str | None = None, *,
+                   limit: int = UPLOAD_LIMIT, **kwargs):
+        """Post the files through `send` (channel.send, followup.send, ...), ten per message."""
+        files = self.files(limit)
+        for i in range(0, len(files), FILES_PER_MESSAGE):
+            batch = files[i:i + FILES_PER_MESSAGE]
+            if i == 0 and content is not None:
+                await send(content, files=batch, **kwargs)
+            else:
+                await send(files=batch, **kwargs)
+
+
+class _Unclosable(io.RawIOBase):
+    """Read-through wrapper so a reading TextIOWrapper can't close the spool file."""
+
+    def __init__(self, fp):
+        self._fp = fp
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        data = self._fp.read(len(b))
+        b[:len(data)] = data
+        return len(data)
@@ -0,0 +1,113 @@
+from __future__ import annotations
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+# sqlite3 keeps this many prepared statements per connection, keyed by SQL text
+STATEMENT_CACHE = int(os.getenv("SQLITE_STATEMENT_CACHE", "256"))
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+Migration = str | Sequence[str] | Callable[[sqlite3.Connection], Any]
+
+
+def migrate(con: sqlite3.Connection, migrations: Sequence[Migration]) -> int:
+    """Apply the migrations past the file's `PRAGMA user_version`.
+
+    Migration N (1-based) is either SQL, a list of SQL statements or a callable
+    taking the connection; it runs in its own transaction together with the
+    bump of user_version to N, so a failure leaves the file at N - 1.
+    """
+    version = con.execute("PRAGMA user_version").fetchone()[0]
+    for number, step in enumerate(migrations[version:], start=version + 1):
+        con.execute("BEGIN")
+        try:
+            if callable(step):
+                step(con)
+            else:
+                for sql in ([step] if isinstance(step, str) else step):
+                    con.execute(sql)
+            con.execute(f"PRAGMA user_version={number}")
+        except BaseException:
+            con.rollback()
+            raise
+        con.commit()
+        version = number
+    return version
+
+
+class Database:
+    """One long-lived SQLite connection that only ever runs on its own thread.
+
+    Every call is queued onto a single worker thread, so the event loop never
+    blocks on SQLite and statements never interleave. The connection uses WAL
+    with `synchronous=NORMAL`, which makes a commit an append to the log rather
+    than an fsync of the database file.
+    """
+
+    def __init__(self, path: str | Path, *, migrations: Sequence[Migration] = ()):
+        self.path = str(path)
+        self.migrations = migrations
+        self.version = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._con: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._con is None:
+            con = sqlite3.connect(self.path, check_same_thread=False, cached_statements=STATEMENT_CACHE)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            self.version = migrate(con, self.migrations)
+            self._con = con
+        return self._con
+
+    def _call(self, fn: Callable, *args):
+        con = self._connect()
+        with con:  # commit on success, roll back on error
+            return fn(con, *args)
+
+    async def run(self, fn: Callable[..., Any], *args):
+        """Run `fn(con, *args)` on the database thread as one transaction."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix=f"sqlite-{Path(self.path).stem}")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, *args)
+
+    async def connect(self):
+        """Open the connection (and migrate the schema) ahead of the first query."""
+        await self.run(lambda con: None)
+
+    async def execute(self, sql: str, params: Iterable = ()) -> int:
+        """Run one statement; returns the number of rows it changed."""
+        return await self.run(lambda con: con.execute(sql, tuple(params)).rowcount)
+
+    async def executemany(self, sql: str, rows: Iterable[Iterable]) -> int:
+        return await self.run(lambda con: con.executemany(sql, [tuple(r) for r in rows]).rowcount)
+
+    async def fetchone(self, sql: str, params: Iterable = ()) -> tuple | None:
+        return await self.run(lambda con: con.execute(sql, tuple(params)).fetchone())
+
+    async def fetchall(self, sql: str, params: Iterable = ()) -> list[tuple]:
+        return await self.run(lambda con: con.execute(sql, tuple(params)).fetchall())
+
+    async def close(self):
+        """Close the connection from its own thread; the next call opens a fresh one."""
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+
+        def shut():
+            con, self._con = self._con, None
+            if con is not None:
+                con.execute("PRAGMA optimize")  # lets SQLite refresh planner stats it found stale
+                con.close()
+
+        try:
+            # queued behind any call still pending, so those finish on the old connection first
+            await asyncio.get_running_loop().run_in_executor(executor, shut)
+        finally:
+            executor.shutdown(wait=False)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import asyncio
+import os
+from datetime import timedelta
+
+import discord
+
+BULK_MAX = 100
+# bulk delete refuses anything over 14 days old; leave room for a message to age while queued
+BULK_MAX_AGE = timedelta(days=14) - timedelta(minutes=10)
+DELETE_WORKERS = int(os.getenv("PRUNE_DELETE_WORKERS", "2"))
+_RETRIES = 3
+
+
+class DeletePipeline:
+    """Deletes messages while the caller is still reading history.
+
+    Recent messages are batched and bulk deleted 100 at a time; older ones go
+    through a small pool of single-delete workers. Both queues are bounded, so
+    `submit` waits when deletion falls behind and memory stays flat however
+    long the channel is. Pacing is left to discord.py, which sleeps on each
+    route's rate-limit headers, so there are no fixed pauses here.
+    """
+
+    def __init__(self, channel: discord.abc.Messageable, *, workers: int = DELETE_WORKERS):
+        self.channel = channel
+        self.deleted = 0
+        self.failed = 0
+        self.oldest_failed: int | None = None  # lowest message id that couldn't be deleted
+        self._batch: list[discord.Message] = []
+        self._bulk: asyncio.Queue = asyncio.Queue(maxsize=2)
+        self._single: asyncio.Queue = asyncio.Queue(maxsize=max(1, workers) * BULK_MAX)
+        self._bulk_task = asyncio.create_task(self._bulk_worker())
+        self._workers = [asyncio.create_task(self._single_worker()) for _ in range(max(1, workers))]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, *_):
+        if exc_type is None:
+            await self.close()
+        else:
+            self.cancel()
+
+    async def submit(self, msg: discord.Message):
+        if discord.utils.utcnow() - msg.created_at < BULK_MAX_AGE:
+            self._batch.append(msg)
+            if len(self._batch) >= BULK_MAX:
+                await self._flush_batch()
+        else:
+            await self._single.put(msg)
+
+    async def _flush_batch(self):
+        if self._batch:
+            batch, self._batch = self._batch, []
+            await self._bulk.put(batch)
+
+    async def close(self):
+        """Delete whatever is still queued and stop the workers."""
+        await self._flush_batch()
+        await self._bulk.put(None)
+        await self._bulk_task  # may still hand failed batches to the single workers
+        for _ in self._workers:
+            await self._single.put(None)
+        await asyncio.gather(*self._workers)
+
+    def cancel(self):
+        for task in (self._bulk_task, *self._workers):
+            task.cancel()
+
+    async def _bulk_worker(self):
+        while (batch := await self._bulk.get()) is not None:
+            try:
+                await self.channel.delete_messages(batch)
+                self.deleted += len(batch)
+            except discord.HTTPException:
+                # one bad message fails the whole call; retry them one by one
+                for m in batch:
+                    await self._single.put(m)
+
+    async def _single_worker(self):
+        while (msg := await self._single.get()) is not None:
+            if await self._delete_one(msg):
+                self.deleted += 1
+            else:
+                self.failed += 1
+                if self.oldest_failed is None or msg.id < self.oldest_failed:
+                    self.oldest_failed = msg.id
+
+    async def _delete_one(self, msg: discord.Message) -> bool:
+        for _ in range(_RETRIES):
+            try:
+                await msg.delete()
+                return True
+            except discord.NotFound:
+                return True  # already gone
+            except discord.HTTPException as e:
+                # discord.py already retried its own 429s; only wait if it gave up on one
+                retry_after = getattr(e, "retry_after", None)
+                if e.status != 429 or not retry_after:
+                    return False
+                await asyncio.sleep(retry_after)
+            except Exception as e:
+                print(f"Failed to delete {msg.id}: {e}")
+                return False
+        return False
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import importlib.abc
+import sys
+import threading
+import time
+
+_state = threading.local()
+
+
+def _stack() -> list[list[float]]:
+    stack = getattr(_state, "stack", None)
+    if stack is None:
+        stack = _state.stack = []
+    return stack
+
+
+class _TimedLoader(importlib.abc.Loader):
+    def __init__(self, finder: "_Finder", name: str, loader):
+        self.finder = finder
+        self.name = name
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # put the real loader back so reloads and importlib.resources don't see us
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        stack = _stack()
+        frame = [0.0]  # time spent in nested imports
+        stack.append(frame)
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1][0] += total
+            self.finder.times[self.name] = (total - frame[0], total)
+
+    def __getattr__(self, attr):
+        return getattr(self.loader, attr)
+
+
+class _Finder(importlib.abc.MetaPathFinder):
+    def __init__(self):
+        self.times: dict[str, tuple[float, float]] = {}
+        self._busy = threading.local()
+
+    def find_spec(self, name, path=None, target=None):
+        if getattr(self._busy, "on", False):
+            return None
+        self._busy.on = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(name, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._busy.on = False
+        if spec.loader is None or not hasattr(spec.loader, "exec_module"):
+            return spec
+        spec.loader = _TimedLoader(self, name, spec.loader)
+        return spec
+
+
+_finder: _Finder | None = None
+
+
+def install():
+    """Start timing imports; call before the modules worth measuring are imported."""
+    global _finder
+    if _finder is None:
+        _finder = _Finder()
+        sys.meta_path.insert(0, _finder)
+
+
+def uninstall():
+    global _finder
+    if _finder is not None and _finder in sys.meta_path:
+        sys.meta_path.remove(_finder)
+    _finder = None
+
+
+def summary(top: int = 10) -> str:
+    """Import time per top-level package, slowest first (like `python -X importtime`)."""
+    if _finder is None or not _finder.times:
+        return "import timing not enabled"
+    packages: dict[str, list] = {}
+    for name, (self_time, _) in _finder.times.items():
+        entry = packages.setdefault(name.partition(".")[0], [0.0, 0])
+        entry[0] += self_time
+        entry[1] += 1
+    total = sum(t for t, _ in packages.values())
+    ranked = sorted(packages.items(), key=lambda kv: kv[1][0], reverse=True)
+    lines = [f"imports: {len(_finder.times)} modules in {total * 1000:.0f} ms"]
+    for pkg, (t, count) in ranked[:top]:
+        lines.append(f"  {pkg:<24} {t * 1000:7.1f} ms  ({count} modules)")
+    return "\n".join(lines)
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import re
+
+Hit = tuple[int, dict]  # (position in the guild's rule list, rule)
+
+
+class _Bucket:
+    """Rules sharing one (scope_channel_id, include_bots) pair."""
+
+    def __init__(self):
+        self.exact_cs: dict[str, list[Hit]] = {}
+        self.exact_ci: dict[str, list[Hit]] = {}
+        self.regex: list[tuple[int, dict, re.Pattern]] = []
+        self._phrases: dict[tuple[bool, str], list[Hit]] = {}
+        self._keys: list[tuple[bool, str]] = []
+        self._single: list[re.Pattern] = []
+        self._prefixes: list[list[int]] = []
+        self._combined: re.Pattern | None = None
+
+    def add(self, order: int, r: dict):
+        phrase = r.get("phrase") or ""
+        case = bool(r.get("case", False))
+        match_type = r.get("match", "contains")
+        if match_type == "exact":
+            if case:
+                self.exact_cs.setdefault(phrase, []).append((order, r))
+            else:
+                self.exact_ci.setdefault(phrase.lower(), []).append((order, r))
+        elif match_type == "contains":
+            key = (case, phrase if case else phrase.lower())
+            self._phrases.setdefault(key, []).append((order, r))
+        elif match_type == "regex":
+            try:
+                rx = re.compile(phrase, 0 if case else re.IGNORECASE)
+            except re.error:
+                return
+            self.regex.append((order, r, rx))
+
+    def finish(self):
+        # longest first: at any position the alternation then reports the longest
+        # phrase, and anything else starting there must be one of its prefixes
+        self._keys = sorted(self._phrases, key=lambda k: len(k[1]), reverse=True)
+        branches = []
+        for i, key in enumerate(self._keys):
+            case, _ = key
+            phrase = self._phrases[key][0][1]["phrase"]
+            src = rf"\b{re.escape(phrase)}\b"
+            self._single.append(re.compile(src, 0 if case else re.IGNORECASE))
+            branches.append(f"(?P<k{i}>{src if case else f'(?i:{src})'})")
+        lowered = [k[1].lower() for k in self._keys]
+        self._prefixes = [
+            [j for j in range(len(lowered)) if j != i and lowered[i].startswith(lowered[j])]
+            for i in range(len(lowered))
+        ]
+        if branches:
+            self._combined = re.compile("(?=" + "|".join(branches) + ")")
+
+    def match(self, text: str) -> list[Hit]:
+        hits: list[Hit] = []
+        if self.exact_cs:
+            hits.extend(self.exact_cs.get(text, ()))
+        if self.exact_ci:
+            hits.extend(self.exact_ci.get(text.lower(), ()))
+        if self._combined is not None:
+            found: set[int] = set()
+            for m in self._combined.finditer(text):
+                i = int(m.lastgroup[1:])
+                found.add(i)
+                pos = m.start()
+                for j in self._prefixes[i]:
+                    if j not in found and self._single[j].match(text, pos):
+                        found.add(j)
+            for i in found:
+                hits.extend(self._phrases[self._keys[i]])
+        for order, r, rx in self.regex:
+            if rx.search(text):
+                hits.append((order, r))
+        return hits
+
+
+class RuleIndex:
+    """Precompiled keyword alert rules for one guild.
+
+    Rules are bucketed by scope channel and bot handling so a message only
+    touches the buckets that can apply to it. Within a bucket `exact` rules are
+    dict lookups and every `contains` phrase shares one combined pattern.
+    """
+
+    def __init__(self, rules: list[dict]):
+        self.size = len(rules)
+        self._buckets: dict[tuple[int | None, bool], _Bucket] = {}
+        for order, r in enumerate(rules):
+            scope = int(r["scope_channel_id"]) if r.get("scope_channel_id") else None
+            key = (scope, bool(r.get("include_bots")))
+            self._buckets.setdefault(key, _Bucket()).add(order, r)
+        for b in self._buckets.values():
+            b.finish()
+
+    def match(self, text: str, channel_id: int, author_is_bot: bool) -> list[dict]:
+        """Matching rules for a message, in the guild's rule order."""
+        keys = [(None, True), (channel_id, True)]
+        if not author_is_bot:
+            keys += [(None, False), (channel_id, False)]
+        hits: list[Hit] = []
+        for key in keys:
+            b = self._buckets.get(key)
+            if b is not None:
+                hits.extend(b.match(text))
+        hits.sort(key=lambda h: h[0])
+        return [r for _, r in hits]
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+import re
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterable
+
+from utils.multiregex import PatternSet
+
+MATCH_WORKERS = int(os.getenv("MATCH_WORKERS", "2"))
+MATCH_BATCH = int(os.getenv("MATCH_BATCH", "200"))
+# seconds one batch may take before its patterns are tested one by one
+MATCH_TIMEOUT = float(os.getenv("MATCH_TIMEOUT", "10"))
+_RETRIES = 2
+
+# spawn rather than fork: the bot process has voice and aiohttp threads running
+_CTX = multiprocessing.get_context("spawn")
+
+_worker_set: PatternSet | None = None
+
+
+def _init(sources: list[tuple[str, int]], pids):
+    global _worker_set
+    pids.put(os.getpid())
+    _worker_set = PatternSet([re.compile(p, f) for p, f in sources])
+
+
+def _match_batch(texts: list[str], skip: frozenset[int]) -> list[list[int]]:
+    out = []
+    for text in texts:
+        out.append([i for i in _worker_set.candidates(text)
+                    if i not in skip and _worker_set.patterns[i].search(text)])
+    return out
+
+
+def _ping():
+    return None
+
+
+def _probe(i: int, texts: list[str]) -> list[bool]:
+    pat = _worker_set.patterns[i]
+    return [pat.search(t) is not None for t in texts]
+
+
+class _Pool(ProcessPoolExecutor):
+    """A process pool whose workers report their pids, so a hung batch can be killed."""
+
+    def __init__(self, workers: int, sources: list[tuple[str, int]]):
+        self.pids = _CTX.SimpleQueue()
+        super().__init__(workers, mp_context=_CTX, initializer=_init, initargs=(sources, self.pids))
+
+    def kill(self):
+        while not self.pids.empty():
+            try:
+                os.kill(self.pids.get(), signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        self.shutdown(wait=False, cancel_futures=True)
+
+
+class MatchExecutor:
+    """Runs a PatternSet over batches of text in worker processes.
+
+    A batch that runs past `timeout` has its workers killed and each pattern
+    re-tried on its own; any pattern that still can't finish is added to
+    `pathological` and skipped from then on, so one catastrophic regex costs a
+    few timeouts instead of the event loop.
+    """
+
+    def __init__(self, patterns: Iterable[str | re.Pattern], *, workers: int = MATCH_WORKERS,
+                 timeout: float = MATCH_TIMEOUT):
+        self.local = PatternSet(patterns)
+        self.patterns = self.local.patterns
+        self.workers = max(1, workers)
+        self.timeout = timeout
+        self.pathological: set[int] = set()
+        self._sources = [(p.pattern, p.flags) for p in self.patterns]
+        self._pool: _Pool | None = None
+        self._probe_pool: _Pool | None = None
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pool_lock = asyncio.Lock()
+        self._probe_lock = asyncio.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _new_pool(self, workers: int) -> _Pool:
+        # start the workers before any timed call, spawning them can take a while
+        loop = asyncio.get_running_loop()
+        pool = _Pool(workers, self._sources)
+        await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(workers)))
+        return pool
+
+    async def _shared_pool(self) -> _Pool:
+        async with self._pool_lock:
+            if self._pool is None:
+                self._pool = await self._new_pool(self.workers)
+            return self._pool
+
+    def close(self):
+        for pool in (self._pool, self._probe_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._pool = self._probe_pool = None
+
+    async def match(self, texts: list[str]) -> list[list[int]]:
+        """For each text, the indexes of the patterns that match it."""
+        if not texts:
+            return []
+        loop = asyncio.get_running_loop()
+        async with self._slots:
+            for attempt in range(_RETRIES + 1):
+                pool = await self._shared_pool()
+                fut = loop.run_in_executor(pool, _match_batch, texts, frozenset(self.pathological))
+                try:
+                    return await asyncio.wait_for(fut, self.timeout)
+                except BrokenProcessPool:
+                    # another batch timed out and took the pool down with it
+                    if pool is self._pool:
+                        self._pool = None
+                    if attempt == _RETRIES:
+                        raise
+                except asyncio.TimeoutError:
+                    if pool is self._pool:
+                        self._pool = None
+                        pool.kill()
+                    break
+        return await self._isolate(texts)
+
+    async def _isolate(self, texts: list[str]) -> list[list[int]]:
+        loop = asyncio.get_running_loop()
+        results: list[list[int]] = [[] for _ in texts]
+        wanted: dict[int, list[int]] = {}
+        for t, text in enumerate(texts):
+            for i in self.local.candidates(text):
+                wanted.setdefault(i, []).append(t)
+        async with self._probe_lock:
+            for i in sorted(wanted):
+                if i in self.pathological:
+                    continue
+                if self._probe_pool is None:
+                    self._probe_pool = await self._new_pool(1)
+                rows = wanted[i]
+                fut = loop.run_in_executor(self._probe_pool, _probe, i, [texts[t] for t in rows])
+                try:
+                    hits = await asyncio.wait_for(fut, self.timeout)
+                except (asyncio.TimeoutError, BrokenProcessPool):
+                    self.pathological.add(i)
+                    self._probe_pool.kill()
+                    self._probe_pool = None
+                    continue
+                for t, hit in zip(rows, hits):
+                    if hit:
+                        results[t].append(i)
+        return results
@@ -0,0 +1,243 @@
+from __future__ import annotations
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, NamedTuple
+
+DISCORD_EPOCH_MS = 1420070400000
+
+
+class IndexedAttachment(NamedTuple):
+    filename: str
+    size: int
+    content_type: str | None
+    url: str
+
+
+class IndexedMessage(NamedTuple):
+    id: int
+    guild_id: int | None
+    channel_id: int
+    author_id: int
+    author_name: str
+    author_bot: bool
+    created_at: datetime
+    content: str
+    attachments: list[IndexedAttachment]
+
+
+def snowflake_at(dt: datetime) -> int:
+    return (int(dt.timestamp() * 1000) - DISCORD_EPOCH_MS) << 22
+
+
+_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS messages(
+        id INTEGER PRIMARY KEY, guild_id INTEGER, channel_id INTEGER NOT NULL,
+        author_id INTEGER NOT NULL, author_name TEXT, author_bot INTEGER NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL, content TEXT NOT NULL DEFAULT '', attachments TEXT)""",
+    "CREATE INDEX IF NOT EXISTS idx_messages_channel ON messages(channel_id, id)",
+    """CREATE TABLE IF NOT EXISTS channel_state(
+        channel_id INTEGER PRIMARY KEY, guild_id INTEGER, high_water INTEGER, synced_at TEXT,
+        low_water INTEGER)""",
+]
+_FTS_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(content, content='messages', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content); END""",
+    """CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO messages_fts(messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        INSERT INTO messages_fts(rowid, content) VALUES (new.id, new.content); END""",
+]
+_COLUMNS = "id, guild_id, channel_id, author_id, author_name, author_bot, created_at, content, attachments"
+
+
+def _to_row(m: IndexedMessage) -> tuple:
+    atts = json.dumps([list(a) for a in m.attachments]) if m.attachments else None
+    return (m.id, m.guild_id, m.channel_id, m.author_id, m.author_name, int(m.author_bot),
+            m.created_at.isoformat(), m.content or "", atts)
+
+
+def _from_row(row: tuple) -> IndexedMessage:
+    mid, gid, cid, aid, aname, abot, created, content, atts = row
+    attachments = [IndexedAttachment(*a) for a in json.loads(atts)] if atts else []
+    return IndexedMessage(mid, gid, cid, aid, aname or str(aid), bool(abot),
+                          datetime.fromisoformat(created), content or "", attachments)
+
+
+class MessageIndex:
+    """SQLite copy of guild message history.
+
+    Each channel has a high-water mark: every message up to that id has been
+    crawled into the index, so a sync only has to fetch what came after it.
+    Live messages are stored as they arrive but never move the mark, since
+    the bot may have missed messages while it was offline. The low-water mark
+    is where the crawled range starts (0 or NULL: the start of the channel);
+    history below it is only fetched once a caller asks for it.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        self._mu = threading.Lock()
+        for stmt in _SCHEMA:
+            self._con.execute(stmt)
+        cols = {row[1] for row in self._con.execute("PRAGMA table_info(channel_state)")}
+        if "low_water" not in cols:
+            self._con.execute("ALTER TABLE channel_state ADD COLUMN low_water INTEGER")
+        try:
+            for stmt in _FTS_SCHEMA:
+                self._con.execute(stmt)
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.fts = False
+        self._con.commit()
+
+    def _run(self, fn, *args):
+        with self._mu:
+            return fn(*args)
+
+    async def _call(self, fn, *args):
+        return await asyncio.to_thread(self._run, fn, *args)
+
+    def close(self):
+        with self._mu:
+            self._con.close()
+
+    # writes
+    def _store(self, rows: list[tuple], channel_id: int | None, guild_id: int | None,
+               high_water: int | None, low_water: int | None):
+        with self._con:
+            # an upsert rather than INSERT OR REPLACE: REPLACE deletes without firing
+            # messages_ad, which would leave the old text in messages_fts
+            self._con.executemany(
+                f"INSERT INTO messages({_COLUMNS}) VALUES (?,?,?,?,?,?,?,?,?) ON CONFLICT(id) DO UPDATE SET "
+                "guild_id=excluded.guild_id, channel_id=excluded.channel_id, author_id=excluded.author_id, "
+                "author_name=excluded.author_name, author_bot=excluded.author_bot, created_at=excluded.created_at, "
+                "content=excluded.content, attachments=excluded.attachments", rows)
+            if high_water is not None or low_water is not None:
+                self._con.execute(
+                    "INSERT INTO channel_state(channel_id, guild_id, high_water, low_water, synced_at) "
+                    "VALUES (?,?,?,?,datetime('now')) ON CONFLICT(channel_id) DO UPDATE SET "
+                    "high_water=COALESCE(excluded.high_water, high_water), "
+                    "low_water=COALESCE(excluded.low_water, low_water), synced_at=excluded.synced_at",
+                    (channel_id, guild_id, high_water, low_water))
+
+    async def store(self, messages: Iterable[IndexedMessage], *, high_water: int | None = None,
+                    low_water: int | None = None, channel_id: int | None = None, guild_id: int | None = None):
+        rows = [_to_row(m) for m in messages]
+        if rows or high_water is not None or low_water is not None:
+            await self._call(self._store, rows, channel_id, guild_id, high_water, low_water)
+
+    def _edit(self, message_id: int, content: str | None, attachments: list[IndexedAttachment] | None):
+        with self._con:
+            if content is not None:
+                self._con.execute("UPDATE messages SET content=? WHERE id=?", (content, message_id))
+            if attachments is not None:
+                atts = json.dumps([list(a) for a in attachments]) if attachments else None
+                self._con.execute("UPDATE messages SET attachments=? WHERE id=?", (atts, message_id))
+
+    async def edit(self, message_id: int, *, content: str | None = None,
+                   attachments: list[IndexedAttachment] | None = None):
+        await self._call(self._edit, message_id, content, attachments)
+
+    def _delete(self, ids: list[int]):
+        with self._con:
+            self._con.executemany("DELETE FROM messages WHERE id=?", [(i,) for i in ids])
+
+    async def delete(self, ids: Iterable[int]):
+        ids = [int(i) for i in ids]
+        if ids:
+            await self._call(self._delete, ids)
+
+    # reads
+    def _high_water(self, channel_id: int) -> int | None:
+        row = self._con.execute("SELECT high_water FROM channel_state WHERE channel_id=?", (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    async def high_water(self, channel_id: int) -> int | None:
+        return await self._call(self._high_water, channel_id)
+
+    def _window(self, channel_id: int) -> tuple[int | None, int]:
+        row = self._con.execute("SELECT high_water, low_water FROM channel_state WHERE channel_id=?",
+                                (channel_id,)).fetchone()
+        return (row[0], row[1] or 0) if row else (None, 0)
+
+    async def window(self, channel_id: int) -> tuple[int | None, int]:
+        """(high-water, low-water) marks; the high mark is None before the first sync."""
+        return await self._call(self._window, channel_id)
+
+    def _count(self, channel_id: int, after_id: int) -> int:
+        return self._con.execute("SELECT COUNT(*) FROM messages WHERE channel_id=? AND id>?",
+                                 (channel_id, after_id)).fetchone()[0]
+
+    async def count(self, channel_id: int, *, after_id: int = 0) -> int:
+        return await self._call(self._count, channel_id, after_id)
+
+    def _page(self, channel_id: int, after_id: int, before_id: int | None, limit: int, newest_first: bool) -> list[tuple]:
+        sql = f"SELECT {_COLUMNS} FROM messages WHERE channel_id=? AND id>?"
+        args: list = [channel_id, after_id]
+        if before_id is not None:
+            sql += " AND id<?"; args.append(before_id)
+        sql += f" ORDER BY id {'DESC' if newest_first else 'ASC'} LIMIT ?"
+        args.append(limit)
+        return self._con.execute(sql, args).fetchall()
+
+    async def iter_channel(self, channel_id: int, *, after_id: int = 0, before_id: int | None = None,
+                           newest_first: bool = False, limit: int | None = None, page_size: int = 1000):
+        """Yield pages of indexed messages for one channel."""
+        remaining = limit
+        while remaining is None or remaining > 0:
+            size = page_size if remaining is None else min(page_size, remaining)
+            rows = await self._call(self._page, channel_id, after_id, before_id, size, newest_first)
+            if not rows:
+                return
+            yield [_from_row(r) for r in rows]
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+            if newest_first:
+                before_id = rows[-1][0]
+            else:
+                after_id = rows[-1][0]
+
+    def _last_seen(self, channel_id: int, after_id: int) -> list[tuple[int, str]]:
+        return self._con.execute(
+            "SELECT author_id, MAX(created_at) FROM messages WHERE channel_id=? AND id>? GROUP BY author_id",
+            (channel_id, after_id)).fetchall()
+
+    async def last_seen(self, channel_id: int, *, after_id: int = 0) -> dict[int, datetime]:
+        rows = await self._call(self._last_seen, channel_id, after_id)
+        return {int(aid): datetime.fromisoformat(ts) for aid, ts in rows}
+
+    def _search(self, guild_id: int, query: str, limit: int) -> list[tuple]:
+        cols = ", ".join(f"m.{c.strip()}" for c in _COLUMNS.split(","))
+        if self.fts:
+            return self._con.execute(
+                f"SELECT {cols} FROM messages_fts f JOIN messages m ON m.id = f.rowid "
+                "WHERE messages_fts MATCH ? AND m.guild_id=? ORDER BY m.id DESC LIMIT ?",
+                (query, guild_id, limit)).fetchall()
+        return self._con.execute(
+            f"SELECT {cols} FROM messages m WHERE m.guild_id=? AND m.content LIKE ? ORDER BY m.id DESC LIMIT ?",
+            (guild_id, f"%{query}%", limit)).fetchall()
+
+    async def search(self, guild_id: int, query: str, *, limit: int = 25) -> list[IndexedMessage]:
+        rows = await self._call(self._search, guild_id, query, limit)
+        return [_from_row(r) for r in rows]
+
+    def _stats(self, guild_id: int) -> tuple[int, int]:
+        msgs = self._con.execute("SELECT COUNT(*) FROM messages WHERE guild_id=?", (guild_id,)).fetchone()[0]
+        chans = self._con.execute("SELECT COUNT(*) FROM channel_state WHERE guild_id=?", (guild_id,)).fetchone()[0]
+        return msgs, chans
+
+    async def stats(self, guild_id: int) -> tuple[int, int]:
+        """(indexed messages, channels with a high-water mark) for a guild."""
+        return await self._call(self._stats, guild_id)
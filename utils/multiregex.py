@@ -0,0 +1,177 @@
+from __future__ import annotations
+import re
+from collections import deque
+from typing import Iterable
+
+try:
+    from re import _parser as _sre_parse
+    from re import _constants as _c
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+    import sre_constants as _c
+
+try:
+    from _sre import unicode_tolower as _tolower
+except ImportError:
+    def _tolower(code: int) -> int:
+        low = chr(code).lower()
+        return ord(low) if len(low) == 1 else code
+
+try:
+    from re._casefix import _EXTRA_CASES
+except ImportError:
+    try:
+        from sre_compile import _ignorecase_fixes as _EXTRA_CASES
+    except ImportError:
+        _EXTRA_CASES = {}
+
+_REPEATS = {_c.MAX_REPEAT, _c.MIN_REPEAT}
+if hasattr(_c, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(_c.POSSESSIVE_REPEAT)
+_ATOMIC = getattr(_c, "ATOMIC_GROUP", None)
+# a single required character prunes almost nothing, so don't bother scanning for it
+MIN_LITERAL = 2
+
+# characters re.IGNORECASE treats as equal beyond simple lowercasing (s/ſ, i/ı, ...)
+_CANON: dict[int, int] = {}
+for _low, _extra in _EXTRA_CASES.items():
+    for _code in (_low, *_extra):
+        _CANON[_code] = min(_low, *_extra)
+
+
+class _FoldTable(dict):
+    """str.translate table folding each character the way re.IGNORECASE compares them."""
+
+    def __missing__(self, code: int) -> int:
+        low = _tolower(code)
+        folded = self[code] = _CANON.get(low, low)
+        return folded
+
+
+_FOLD = _FoldTable()
+
+
+def fold(text: str) -> str:
+    return text.translate(_FOLD)
+
+
+def _required(seq) -> list[str]:
+    """Literal runs that every match of the parsed sequence must contain."""
+    out: list[str] = []
+    run: list[str] = []
+
+    def cut():
+        if run:
+            out.append("".join(run))
+            run.clear()
+
+    for op, av in seq:
+        if op is _c.LITERAL:
+            run.append(chr(av))
+            continue
+        if op is _c.AT:  # zero-width, the run stays contiguous
+            continue
+        cut()
+        if op is _c.SUBPATTERN:
+            out.extend(_required(av[3]))
+        elif op in _REPEATS:
+            lo, _, sub = av
+            if lo >= 1:
+                out.extend(_required(sub))
+        elif op is _ATOMIC:
+            out.extend(_required(av))
+    cut()
+    return out
+
+
+def required_literal(pattern: re.Pattern) -> str | None:
+    """The longest literal substring any match of `pattern` has to contain, if there is one."""
+    if not isinstance(pattern.pattern, str):
+        return None
+    try:
+        parsed = _sre_parse.parse(pattern.pattern, pattern.flags)
+    except Exception:
+        return None
+    best = max(_required(parsed), key=len, default=None)
+    if best is None or len(best) < MIN_LITERAL:
+        return None
+    return best
+
+
+class _Automaton:
+    """Aho–Corasick over folded literals: one pass reports every literal present."""
+
+    def __init__(self, literals: list[str]):
+        self.goto: list[dict[str, int]] = [{}]
+        self.out: list[tuple[int, ...]] = [()]
+        for i, lit in enumerate(literals):
+            state = 0
+            for ch in lit:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (i,)
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def scan(self, text: str) -> set[int]:
+        goto, fail, out = self.goto, self.fail, self.out
+        found: set[int] = set()
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+class PatternSet:
+    """Many regexes matched against a text with one literal prefilter pass.
+
+    Each pattern is reduced to the longest literal its matches must contain.
+    Every literal goes into one Aho–Corasick automaton over case-folded text,
+    so a single scan lists the literals present; only patterns whose literal
+    turned up (plus those with no usable literal) are run for real.
+    """
+
+    def __init__(self, patterns: Iterable[str | re.Pattern], flags: int = 0):
+        self.patterns: list[re.Pattern] = [p if isinstance(p, re.Pattern) else re.compile(p, flags) for p in patterns]
+        by_literal: dict[str, list[int]] = {}
+        self._always: list[int] = []
+        for i, pat in enumerate(self.patterns):
+            lit = required_literal(pat)
+            if lit is None:
+                self._always.append(i)
+            else:
+                by_literal.setdefault(fold(lit), []).append(i)
+        self._owners = list(by_literal.values())
+        self._automaton = _Automaton(list(by_literal)) if by_literal else None
+
+    def __len__(self):
+        return len(self.patterns)
+
+    def candidates(self, text: str) -> list[int]:
+        """Indexes of patterns that might match `text` (a superset of matches())."""
+        cand = set(self._always)
+        if self._automaton is not None:
+            for i in self._automaton.scan(fold(text)):
+                cand.update(self._owners[i])
+        return sorted(cand)
+
+    def matches(self, text: str) -> list[int]:
+        """Indexes, in upload order, of every pattern that matches `text`."""
+        return [i for i in self.candidates(text) if self.patterns[i].search(text)]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from bisect import bisect_left
+from typing import Iterable
+
+import discord
+
+_N = 3  # substring lookups go through trigrams of the names
+
+
+def _grams(key: str) -> set[str]:
+    return {key[i:i + _N] for i in range(len(key) - _N + 1)}
+
+
+class NameIndex:
+    """Casefolded member names -> member ids, for exact, prefix and substring lookups.
+
+    Prefixes are answered from a sorted key list; substrings of three or more
+    characters intersect the trigram postings of the query and only check the
+    keys that survive, so a lookup no longer scans every member.
+    """
+
+    def __init__(self):
+        self._ids: dict[str, set[int]] = {}
+        self._grams: dict[str, set[str]] = {}
+        self._keys: list[str] = []
+        self._sorted = True
+
+    @classmethod
+    def from_members(cls, members: Iterable[discord.Member]) -> "NameIndex":
+        index = cls()
+        for m in members:
+            index.add(m.id, m.name, m.display_name, m.global_name)
+        return index
+
+    def add(self, member_id: int, *names: str | None):
+        for name in names:
+            if not name:
+                continue
+            key = name.casefold()
+            ids = self._ids.get(key)
+            if ids is None:
+                ids = self._ids[key] = set()
+                self._keys.append(key)
+                self._sorted = False
+                for g in _grams(key):
+                    self._grams.setdefault(g, set()).add(key)
+            ids.add(int(member_id))
+
+    def exact(self, query: str) -> set[int]:
+        return set(self._ids.get(query.casefold(), ()))
+
+    def prefix(self, query: str) -> set[int]:
+        if not self._sorted:
+            self._keys.sort()
+            self._sorted = True
+        query = query.casefold()
+        out: set[int] = set()
+        i = bisect_left(self._keys, query)
+        while i < len(self._keys) and self._keys[i].startswith(query):
+            out |= self._ids[self._keys[i]]
+            i += 1
+        return out
+
+    def containing(self, query: str) -> set[int]:
+        query = query.casefold()
+        if len(query) < _N:
+            keys = (k for k in self._ids if query in k)
+        else:
+            postings = sorted((self._grams.get(g, set()) for g in _grams(query)), key=len)
+            keys = set.intersection(*postings) if postings[0] else set()
+            keys = (k for k in keys if query in k)
+        out: set[int] = set()
+        for k in keys:
+            out |= self._ids[k]
+        return out
+
+    def lookup(self, query: str) -> set[int]:
+        """Members matching `query` at the first tier that matches at all: exact name, prefix, substring."""
+        query = query.strip()
+        if not query:
+            return set()
+        for tier in (self.exact, self.prefix, self.containing):
+            ids = tier(query)
+            if ids:
+                return ids
+        return set()
+
+    def resolve(self, query: str) -> int | None:
+        """The member `query` names, if that tier has exactly one; otherwise it's ambiguous or unknown."""
+        ids = self.lookup(query)
+        return next(iter(ids)) if len(ids) == 1 else None
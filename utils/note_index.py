@@ -0,0 +1,129 @@
+from __future__ import annotations
+import re
+from bisect import bisect_left, insort
+
+_TOKEN = re.compile(r"\w+")
+
+# per query term, the best kind of hit a note got
+_TAG_EXACT, _TAG_PREFIX, _WORD_EXACT, _WORD_PREFIX = 4, 3, 2, 1
+
+
+def tokens(text: str) -> set[str]:
+    return set(_TOKEN.findall(text.casefold()))
+
+
+class _Postings:
+    """token -> note ids, with the vocabulary kept sorted for prefix lookups."""
+
+    def __init__(self):
+        self.ids: dict[str, set[int]] = {}
+        self.vocab: list[str] = []
+
+    def add(self, token: str, nid: int):
+        bucket = self.ids.get(token)
+        if bucket is None:
+            bucket = self.ids[token] = set()
+            insort(self.vocab, token)
+        bucket.add(nid)
+
+    def discard(self, token: str, nid: int):
+        bucket = self.ids.get(token)
+        if bucket is None:
+            return
+        bucket.discard(nid)
+        if not bucket:
+            del self.ids[token]
+            del self.vocab[bisect_left(self.vocab, token)]
+
+    def prefixed(self, term: str):
+        """(token, ids) for every token starting with `term`."""
+        i = bisect_left(self.vocab, term)
+        while i < len(self.vocab) and self.vocab[i].startswith(term):
+            token = self.vocab[i]
+            yield token, self.ids[token]
+            i += 1
+
+
+class NoteIndex:
+    """Inverted index over one guild's notes: words, tags, member and author.
+
+    `by_user` and `by_author` are id lists kept sorted, so they double as the
+    paging order for a member's notes.
+    """
+
+    def __init__(self):
+        self.words = _Postings()
+        self.tags = _Postings()
+        self.by_user: dict[str, list[int]] = {}
+        self.by_author: dict[str, list[int]] = {}
+
+    @staticmethod
+    def _tag_tokens(note: dict) -> set[str]:
+        out = set()
+        for tag in note.get("tags") or ():
+            out |= tokens(tag)
+        return out
+
+    def add(self, note: dict):
+        nid = int(note["id"])
+        for tok in tokens(note.get("note", "")):
+            self.words.add(tok, nid)
+        for tok in self._tag_tokens(note):
+            self.tags.add(tok, nid)
+        for table, key in ((self.by_user, str(note["user_id"])), (self.by_author, str(note["author_id"]))):
+            ids = table.setdefault(key, [])
+            if ids and ids[-1] < nid:
+                ids.append(nid)  # new notes get the highest id
+            else:
+                insort(ids, nid)
+
+    def remove(self, note: dict):
+        nid = int(note["id"])
+        for tok in tokens(note.get("note", "")):
+            self.words.discard(tok, nid)
+        for tok in self._tag_tokens(note):
+            self.tags.discard(tok, nid)
+        for table, key in ((self.by_user, str(note["user_id"])), (self.by_author, str(note["author_id"]))):
+            ids = table.get(key)
+            if ids is None:
+                continue
+            i = bisect_left(ids, nid)
+            if i < len(ids) and ids[i] == nid:
+                del ids[i]
+            if not ids:
+                del table[key]
+
+    def _term_hits(self, term: str) -> dict[int, int]:
+        hits: dict[int, int] = {}
+        for postings, exact, prefix in ((self.words, _WORD_EXACT, _WORD_PREFIX),
+                                        (self.tags, _TAG_EXACT, _TAG_PREFIX)):
+            for token, ids in postings.prefixed(term):
+                weight = exact if token == term else prefix
+                for nid in ids:
+                    if hits.get(nid, 0) < weight:
+                        hits[nid] = weight
+        return hits
+
+    def search(self, query: str, *, user_id=None, author_id=None) -> list[int]:
+        """Ids of notes matching every query word (as a word or prefix), best first.
+
+        Tag hits outrank text hits and exact words outrank prefixes; ties go to
+        the newest note.
+        """
+        terms = sorted(tokens(query), key=len, reverse=True)  # longest terms are the most selective
+        if not terms:
+            return []
+        scores: dict[int, int] | None = None
+        for filt, table in ((user_id, self.by_user), (author_id, self.by_author)):
+            if filt is not None:
+                ids = table.get(str(filt), ())
+                scores = {nid: 0 for nid in (ids if scores is None else scores.keys() & ids)}
+        for term in terms:
+            hits = self._term_hits(term)
+            if scores is None:
+                scores = hits
+            else:
+                scores = {nid: s + hits[nid] for nid, s in scores.items() if nid in hits}
+            if not scores:
+                return []
+        return sorted(scores, key=lambda nid: (-scores[nid], -nid))
@@ -0,0 +1,217 @@
+from __future__ import annotations
+import asyncio
+import json
+import os
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+
+from utils.note_index import NoteIndex
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+NOTES_PATH = Path(os.getenv("NOTES_JSON_PATH") or BASE_DIR / "data" / "mod_notes.json")
+# journal entries written before they are folded into the snapshot
+COMPACT_EVERY = int(os.getenv("NOTES_COMPACT_EVERY", "1000"))
+
+
+class NoteStore:
+    """Moderation notes kept as a snapshot plus an append-only journal.
+
+    `mod_notes.json` is a full snapshot (same layout as before, plus the journal
+    sequence it covers); every change is first appended as one JSON line to
+    `mod_notes.journal.jsonl` and fsynced, so a save costs the size of one note.
+    Every `compact_every` entries the snapshot is rewritten atomically and the
+    journal emptied. Loading replays the journal over the snapshot; a line cut
+    short by a crash is dropped.
+    """
+
+    def __init__(self, path: Path = NOTES_PATH, *, compact_every: int = COMPACT_EVERY):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".journal.jsonl")
+        self.compact_every = max(1, compact_every)
+        self.lock = asyncio.Lock()
+        self._guilds: dict[str, dict] = {}
+        self._seq = 0  # last journal entry applied
+        self._pending = 0  # journal entries since the last compaction
+        self._journal = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    # loading
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        for gid, g in (data.get("guilds") or {}).items():
+            guild = self._guild(gid)
+            guild["_seq"] = int(g.get("_seq", 1))
+            for n in g.get("notes", []):
+                guild["notes"][int(n["id"])] = n
+                guild["index"].add(n)
+        snapshot_seq = self._seq = int(data.get("journal_seq", 0))
+        self._replay(snapshot_seq)
+        self._journal = open(self.journal_path, "ab")
+
+    def _replay(self, snapshot_seq: int):
+        try:
+            raw = self.journal_path.read_bytes()
+        except FileNotFoundError:
+            return
+        good = 0
+        for line in raw.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("truncated")
+                op = json.loads(line)
+            except ValueError:
+                break
+            good += len(line)
+            if op["seq"] > snapshot_seq:
+                self._apply(op)
+                self._seq = op["seq"]
+                self._pending += 1
+        if good < len(raw):
+            # cut off the torn tail so the next append starts on a clean line
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(good)
+
+    # state
+
+    def _guild(self, gid) -> dict:
+        g = self._guilds.get(str(gid))
+        if g is None:
+            g = self._guilds[str(gid)] = {"_seq": 1, "notes": {}, "index": NoteIndex()}
+        return g
+
+    def _apply(self, op: dict):
+        g = self._guild(op["guild"])
+        kind = op["op"]
+        if kind == "add":
+            note = op["note"]
+            old = g["notes"].get(int(note["id"]))
+            if old is not None:
+                g["index"].remove(old)
+            g["notes"][int(note["id"])] = note
+            g["index"].add(note)
+            g["_seq"] = max(g["_seq"], int(note["id"]) + 1)
+        elif kind == "edit":
+            note = g["notes"].get(int(op["id"]))
+            if note is not None:
+                g["index"].remove(note)
+                note.update(op["fields"])
+                g["index"].add(note)
+        elif kind == "remove":
+            note = g["notes"].pop(int(op["id"]), None)
+            if note is not None:
+                g["index"].remove(note)
+
+    def notes(self, gid) -> list[dict]:
+        """All notes in a guild, oldest first."""
+        return list(self._guild(gid)["notes"].values())
+
+    def get(self, gid, note_id: int) -> dict | None:
+        return self._guild(gid)["notes"].get(int(note_id))
+
+    def member_page(self, gid, user_id, *, start: int = 0, after: int | None = None,
+                    before: int | None = None, limit: int = 10) -> tuple[list[dict], int, int]:
+        """One page of a member's notes in id order: (notes, offset of the first, total).
+
+        The page starts at `start`, or right after the note id `after`, or ends
+        right before the note id `before`; cursors keep working when notes are
+        added or removed between pages.
+        """
+        g = self._guild(gid)
+        ids = g["index"].by_user.get(str(user_id), [])
+        if after is not None:
+            start = bisect_right(ids, after)
+        elif before is not None:
+            start = bisect_left(ids, before) - limit
+        if start >= len(ids):
+            start = (len(ids) - 1) // limit * limit
+        start = max(0, start)
+        return [g["notes"][nid] for nid in ids[start:start + limit]], start, len(ids)
+
+    def search(self, gid, query: str, *, user_id=None, author_id=None, limit: int = 15) -> list[dict]:
+        """Ranked notes matching every word of `query`; see NoteIndex.search."""
+        g = self._guild(gid)
+        ids = g["index"].search(query, user_id=user_id, author_id=author_id)
+        return [g["notes"][nid] for nid in ids[:limit]]
+
+    # writes
+
+    def _append(self, line: bytes):
+        self._journal.write(line)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    async def _commit(self, op: dict):
+        # journal first: if the write fails the in-memory state is untouched
+        op["seq"] = self._seq + 1
+        line = json.dumps(op, ensure_ascii=False).encode("utf-8") + b"\n"
+        await asyncio.to_thread(self._append, line)
+        self._seq = op["seq"]
+        self._apply(op)
+        self._pending += 1
+        if self._pending >= self.compact_every:
+            await asyncio.to_thread(self._compact, self._snapshot())
+
+    async def add(self, gid, *, user_id, author_id, note: str, tags: list[str], ts: str) -> dict:
+        async with self.lock:
+            entry = {"id": self._guild(gid)["_seq"], "user_id": str(user_id), "author_id": str(author_id),
+                     "ts": ts, "note": note, "tags": tags}
+            await self._commit({"op": "add", "guild": str(gid), "note": entry})
+            return self.get(gid, entry["id"])
+
+    async def edit(self, gid, note_id: int, *, note: str, ts: str) -> dict | None:
+        async with self.lock:
+            if self.get(gid, note_id) is None:
+                return None
+            await self._commit({"op": "edit", "guild": str(gid), "id": int(note_id),
+                                "fields": {"note": note, "edited_ts": ts}})
+            return self.get(gid, note_id)
+
+    async def remove(self, gid, note_id: int) -> dict | None:
+        async with self.lock:
+            entry = self.get(gid, note_id)
+            if entry is None:
+                return None
+            await self._commit({"op": "remove", "guild": str(gid), "id": int(note_id)})
+            return entry
+
+    # compaction
+
+    def _snapshot(self) -> dict:
+        # taken on the event loop: reads there can add guilds to _guilds at any time,
+        # while the note dicts themselves only change under self.lock, which is held
+        return {
+            "journal_seq": self._seq,
+            "guilds": {gid: {"_seq": g["_seq"], "notes": list(g["notes"].values())}
+                       for gid, g in self._guilds.items()},
+        }
+
+    def _compact(self, data: dict):
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+        # the snapshot now records journal_seq, so a crash before this truncate
+        # only means the old entries get skipped on the next load
+        self._journal.truncate(0)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._pending = 0
+
+
+_stores: dict[Path, NoteStore] = {}
+
+
+def open_store(path: Path = NOTES_PATH) -> NoteStore:
+    """The process-wide store for `path`, so every cog appends to the same journal."""
+    key = Path(path).resolve()
+    store = _stores.get(key)
+    if store is None:
+        store = _stores[key] = NoteStore(key)
+    return store
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import asyncio
+import atexit
+import json
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Any
+
+# how long a change waits for more changes before the file is written
+DEBOUNCE_SECONDS = float(os.getenv("PERSIST_DEBOUNCE_SECONDS", "2"))
+
+_writers: "weakref.WeakSet[JsonWriter]" = weakref.WeakSet()
+
+
+def read_json(path: str | Path, default: Any = None) -> Any:
+    """Parsed contents of `path`, or `default` if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def write_atomic(path: str | Path, text: str):
+    """Replace `path` with `text` so readers see either the old or the new file."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class JsonWriter:
+    """Debounced, atomic writes of one JSON document.
+
+    `save(data)` marks the file dirty; the first call starts a `delay` second
+    timer and every save made before it fires goes out in the same write. The
+    data is serialized on the event loop (so it is a consistent snapshot of
+    state the loop owns) and written from a worker thread. Without a running
+    loop, `save` writes straight away.
+    """
+
+    def __init__(self, path: str | Path, *, indent: int | None = None, delay: float = DEBOUNCE_SECONDS):
+        self.path = Path(path)
+        self.indent = indent
+        self.delay = delay
+        self._data: Any = None
+        self._requested = 0  # save() calls so far
+        self._written = 0  # the save() call the file on disk reflects
+        self._timer: asyncio.Task | None = None
+        self._io_lock = threading.Lock()
+        _writers.add(self)
+
+    @property
+    def dirty(self) -> bool:
+        return self._written < self._requested
+
+    @property
+    def pending(self) -> Any:
+        """The data of a save that hasn't reached the disk yet, else None."""
+        return self._data if self.dirty else None
+
+    def save(self, data: Any):
+        self._data = data
+        self._requested += 1
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush_sync()
+            return
+        if self._timer is None or self._timer.done():
+            self._timer = loop.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        # a save made while a write is in flight finds this task still running,
+        # so keep going until nothing is left unwritten
+        while self.dirty:
+            await asyncio.sleep(self.delay)
+            await self.flush()
+
+    def _snapshot(self) -> tuple[int, str]:
+        return self._requested, json.dumps(self._data, ensure_ascii=False, indent=self.indent)
+
+    def _write(self, version: int, text: str):
+        with self._io_lock:
+            if version <= self._written:
+                return  # a newer snapshot already got there
+            write_atomic(self.path, text)
+            self._written = version
+
+    async def flush(self):
+        if self.dirty:
+            await asyncio.to_thread(self._write, *self._snapshot())
+
+    def flush_sync(self):
+        if self.dirty:
+            self._write(*self._snapshot())
+
+
+def flush_all_sync():
+    """Write every dirty file now; for shutdown."""
+    for w in list(_writers):
+        try:
+            w.flush_sync()
+        except Exception as e:
+            print(f"Failed to flush {w.path}: {e}")
+
+
+atexit.register(flush_all_sync)
@@ -6,6 +6,14 @@ from typing import Iterable
 RESPONSES_FILE = Path("responses.json")
 RESPONSES: list[dict] = []
 
+# One alternation over every trigger, each entry in its own lookahead group so
+# every start position is tried and the lowest entry index can be picked.
+_COMBINED: re.Pattern | None = None
+_GROUP_ENTRY: dict[int, int] = {}
+# (entry index, pattern) for triggers that can't live inside the alternation
+_FALLBACK: list[tuple[int, re.Pattern]] = []
+_UNSAFE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+
 def load_responses(path: str | Path = RESPONSES_FILE) -> list[dict]:
     global RESPONSES
     try:
@@ -17,10 +25,15 @@ def load_responses(path: str | Path = RESPONSES_FILE) -> list[dict]:
     return RESPONSES
 
 def compile_triggers() -> None:
-    for e in RESPONSES:
+    global _COMBINED, _GROUP_ENTRY, _FALLBACK
+    branches: list[str] = []
+    owners: list[int] = []
+    fallback: list[tuple[int, re.Pattern]] = []
+    for idx, e in enumerate(RESPONSES):
         mode = (e.get("mode") or "word").lower()
         triggers: Iterable[str] = e.get("triggers") or []
         pats = []
+        sources = []
         for t in triggers:
             s = (t or "").strip()
             if not s:
@@ -28,18 +41,69 @@ def compile_triggers() -> None:
             if mode == "regex" or s.startswith("re:"):
                 pat = s[3:] if s.startswith("re:") else s
                 try:
-                    pats.append(re.compile(pat, re.I))
+                    rx = re.compile(pat, re.I)
                 except re.error:
                     continue
+                # backrefs, named groups and inline global flags change meaning
+                # (or fail) once spliced into a bigger pattern
+                if rx.groupindex or _UNSAFE.search(pat) or _splice_fails(pat):
+                    fallback.append((idx, rx))
+                else:
+                    sources.append(pat)
+                pats.append(rx)
+                continue
             elif mode == "contains":
-                pats.append(re.compile(re.escape(s), re.I))
+                src = re.escape(s)
             else:
                 token = re.escape(s).replace(r"\ ", r"\s+")
-                pats.append(re.compile(rf"(?<!\w){token}(?!\w)", re.I))
+                src = rf"(?<!\w){token}(?!\w)"
+            pats.append(re.compile(src, re.I))
+            sources.append(src)
         e["_patterns"] = pats
+        if sources:
+            branches.append(f"(?=(?P<_e{idx}>" + "|".join(f"(?:{s})" for s in sources) + "))")
+            owners.append(idx)
+
+    combined = None
+    groups: dict[int, int] = {}
+    if branches:
+        try:
+            combined = re.compile("|".join(branches), re.I)
+        except re.error:
+            combined = None
+            fallback.extend((i, rx) for i in owners for rx in RESPONSES[i]["_patterns"])
+        else:
+            groups = {num: int(name[2:]) for name, num in combined.groupindex.items()}
+    fallback.sort(key=lambda x: x[0])
+    _COMBINED, _GROUP_ENTRY, _FALLBACK = combined, groups, fallback
+
+def _splice_fails(pat: str) -> bool:
+    try:
+        re.compile(f"(?=(?P<_probe>(?:{pat})))|x", re.I)
+    except re.error:
+        return True
+    return False
 
 def match_response(text: str, entry: dict) -> bool:
     for rx in entry.get("_patterns", []):
         if rx.search(text):
             return True
     return False
+
+def first_match(text: str) -> dict | None:
+    """Return the first entry in RESPONSES order whose triggers match `text`."""
+    best: int | None = None
+    if _COMBINED is not None:
+        for m in _COMBINED.finditer(text):
+            idx = _GROUP_ENTRY[m.lastindex]
+            if best is None or idx < best:
+                best = idx
+                if idx == 0:
+                    break
+    for idx, rx in _FALLBACK:
+        if best is not None and idx >= best:
+            break
+        if rx.search(text):
+            best = idx
+            break
+    return RESPONSES[best] if best is not None else None
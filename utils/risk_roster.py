@@ -6,7 +6,6 @@ from datetime import date, datetime, timezone
 from pathlib import Path
 from typing import Any
 
-from openpyxl import load_workbook
 
 
 RISK_SOURCE_FILE = Path("data/High Risk TMH.xlsx")
@@ -82,6 +81,8 @@ def build_entries_from_sheet() -> list[dict[str, Any]]:
     if not RISK_SOURCE_FILE.exists():
         raise FileNotFoundError(f"Roster source file not found at {RISK_SOURCE_FILE}")
 
+    from openpyxl import load_workbook
+
     workbook = load_workbook(RISK_SOURCE_FILE, data_only=True)
     worksheet = workbook.active
 
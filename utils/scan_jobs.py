@@ -0,0 +1,149 @@
+from __future__ import annotations
+import json
+import os
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+SCAN_DIR = BASE_DIR / "data" / "scan_jobs"
+CHECKPOINT_SECONDS = float(os.getenv("SCAN_CHECKPOINT_SECONDS", "30"))
+
+
+class ScanJob:
+    """On-disk checkpoint of a long channel scan.
+
+    `<id>.json` holds the scan parameters, a cursor per channel (every message
+    up to that id has been processed) and any command specific `state`;
+    `<id>.csv` is where a scan streams its partial results.
+    """
+
+    _running: set[str] = set()
+
+    def __init__(self, data: dict):
+        self.data = data
+        self._last_save = 0.0
+
+    @property
+    def id(self) -> str:
+        return self.data["id"]
+
+    @property
+    def kind(self) -> str:
+        return self.data["kind"]
+
+    @property
+    def guild_id(self) -> int:
+        return self.data["guild_id"]
+
+    @property
+    def params(self) -> dict:
+        return self.data["params"]
+
+    @property
+    def state(self) -> dict:
+        return self.data["state"]
+
+    @property
+    def json_path(self) -> Path:
+        return SCAN_DIR / f"{self.id}.json"
+
+    @property
+    def results_path(self) -> Path:
+        return SCAN_DIR / f"{self.id}.csv"
+
+    @classmethod
+    def create(cls, kind: str, guild_id: int, user_id: int, channel_ids: list[int], params: dict) -> "ScanJob":
+        now = time.time()
+        job = cls({
+            "id": f"{kind}-{int(now * 1000):x}",
+            "kind": kind,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "created": now,
+            "updated": now,
+            "channels": [int(c) for c in channel_ids],
+            "cursors": {},
+            "done": [],
+            "params": params,
+            "state": {},
+        })
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, job_id: str) -> "ScanJob | None":
+        path = SCAN_DIR / f"{Path(job_id).name}.json"
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    @classmethod
+    def for_guild(cls, guild_id: int) -> list["ScanJob"]:
+        """Unfinished jobs for a guild, newest first."""
+        jobs = []
+        for path in SCAN_DIR.glob("*.json"):
+            job = cls.load(path.stem)
+            if job and job.guild_id == guild_id:
+                jobs.append(job)
+        jobs.sort(key=lambda j: j.data["created"], reverse=True)
+        return jobs
+
+    def claim(self) -> bool:
+        """Mark the job as running in this process; False if it already is."""
+        if self.id in ScanJob._running:
+            return False
+        ScanJob._running.add(self.id)
+        return True
+
+    def release(self):
+        ScanJob._running.discard(self.id)
+
+    @property
+    def running(self) -> bool:
+        return self.id in ScanJob._running
+
+    @property
+    def channel_ids(self) -> list[int]:
+        return self.data["channels"]
+
+    def cursor(self, channel_id: int) -> int | None:
+        return self.data["cursors"].get(str(channel_id))
+
+    def is_done(self, channel_id: int) -> bool:
+        return channel_id in self.data["done"]
+
+    def pending_channels(self) -> list[int]:
+        done = set(self.data["done"])
+        return [c for c in self.channel_ids if c not in done]
+
+    def checkpoint(self, cursors: dict[int, int], done: set[int] | None = None, **state):
+        """Record progress; cursors only ever move forward."""
+        saved = self.data["cursors"]
+        for cid, mid in cursors.items():
+            if mid and mid > saved.get(str(cid), 0):
+                saved[str(cid)] = mid
+        if done:
+            self.data["done"] = sorted(set(self.data["done"]) | {int(c) for c in done})
+        self.state.update(state)
+        self.save()
+
+    def due(self) -> bool:
+        return time.monotonic() - self._last_save >= CHECKPOINT_SECONDS
+
+    def save(self):
+        SCAN_DIR.mkdir(parents=True, exist_ok=True)
+        self.data["updated"] = time.time()
+        tmp = self.json_path.with_suffix(".json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f)
+        os.replace(tmp, self.json_path)
+        self._last_save = time.monotonic()
+
+    def discard(self):
+        for path in (self.json_path, self.results_path):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass